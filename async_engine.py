@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCrawlEngine:
+    """Runs JobCrawler.process_company for many companies at once with a bounded worker pool"""
+
+    def __init__(self, crawler, concurrency=8):
+        self.crawler = crawler
+        self.concurrency = max(1, int(concurrency))
+
+    async def _worker(self, queue, executor, results, total):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                index, company = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            logger.info(f"Processing {index+1}/{total}: {company}")
+            try:
+                # The crawler is blocking (requests + BeautifulSoup), so each worker
+                # drives it from its own thread; the pool size bounds concurrency
+                results[index] = await loop.run_in_executor(executor, self.crawler.process_company, company)
+            except Exception as e:
+                logger.error(f"Worker failed on {company}: {e}")
+
+            # Save progress after each company, same as the sync path
+            self.crawler.save_progress()
+
+    async def crawl(self, companies):
+        """Process `companies` concurrently and return result dicts in input order"""
+        queue = asyncio.Queue()
+        for item in enumerate(companies):
+            queue.put_nowait(item)
+
+        results = [None] * len(companies)
+        workers = min(self.concurrency, len(companies)) or 1
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='crawl') as executor:
+            await asyncio.gather(*(self._worker(queue, executor, results, len(companies))
+                                   for _ in range(workers)))
+
+        return [r for r in results if r]
+
+    def run(self, companies):
+        """Synchronous entry point for callers outside an event loop"""
+        return asyncio.run(self.crawl(companies))
@@ -0,0 +1,107 @@
+import logging
+import re
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Where each applicant tracking system's job board shows up in links and embeds
+ATS_PATTERNS = {
+    'greenhouse': re.compile(r'(?:boards|job-boards)(?:\.eu)?\.greenhouse\.io/(?:embed/job_board(?:/js)?\?for=)?([\w-]+)', re.I),
+    'lever': re.compile(r'jobs\.(?:eu\.)?lever\.co/([\w.-]+)', re.I),
+    # Either apply.workable.com/<account> or <account>.workable.com. The lookbehind
+    # stops the subdomain form re-scanning every suffix of long word runs (inline JS)
+    'workable': re.compile(r'apply\.workable\.com/(?:api/v\d+/widget/accounts/)?([\w-]+)|(?<![\w-])([\w-]+)\.workable\.com', re.I),
+    'smartrecruiters': re.compile(r'(?:jobs|careers)\.smartrecruiters\.com/([\w-]+)', re.I),
+    'ashby': re.compile(r'jobs\.ashbyhq\.com/([\w.%-]+)', re.I),
+}
+
+# Public JSON job feeds; {token} is the company's board identifier
+ATS_FEEDS = {
+    'greenhouse': 'https://boards-api.greenhouse.io/v1/boards/{token}/jobs',
+    'lever': 'https://api.lever.co/v0/postings/{token}?mode=json',
+    'workable': 'https://apply.workable.com/api/v1/widget/accounts/{token}',
+    'smartrecruiters': 'https://api.smartrecruiters.com/v1/companies/{token}/postings',
+    'ashby': 'https://api.ashbyhq.com/posting-api/job-board/{token}',
+}
+
+# Path segments that the patterns can pick up but are never a board token
+NOT_TOKENS = {'embed', 'api', 'apply', 'www', 'jobs', 'careers', 'v0', 'v1', 'j', 'static'}
+
+
+def detect_boards(text):
+    """Return (provider, token) pairs for every ATS board referenced in `text`"""
+    boards = {}
+    for provider, pattern in ATS_PATTERNS.items():
+        for match in pattern.finditer(text):
+            token = next(group for group in match.groups() if group)
+            key = (provider, token.lower())
+            if token.lower() not in NOT_TOKENS and key not in boards:
+                boards[key] = (provider, token)
+    return list(boards.values())
+
+
+def _location(*parts):
+    return ', '.join(part for part in parts if part)
+
+
+def parse_feed(provider, token, data):
+    """Normalise a provider's feed into [{'title', 'location', 'url'}]"""
+    if provider == 'greenhouse':
+        return [{'title': job.get('title', ''),
+                 'location': (job.get('location') or {}).get('name', ''),
+                 'url': job.get('absolute_url', '')}
+                for job in data.get('jobs', [])]
+    if provider == 'lever':
+        return [{'title': job.get('text', ''),
+                 'location': (job.get('categories') or {}).get('location', ''),
+                 'url': job.get('hostedUrl', '')}
+                for job in data]
+    if provider == 'workable':
+        return [{'title': job.get('title', ''),
+                 'location': _location(job.get('city'), job.get('country')),
+                 'url': job.get('url') or job.get('shortlink', '')}
+                for job in data.get('jobs', [])]
+    if provider == 'smartrecruiters':
+        return [{'title': job.get('name', ''),
+                 'location': _location((job.get('location') or {}).get('city'),
+                                       (job.get('location') or {}).get('country')),
+                 'url': f"https://jobs.smartrecruiters.com/{token}/{job.get('id', '')}"}
+                for job in data.get('content', [])]
+    if provider == 'ashby':
+        return [{'title': job.get('title', ''),
+                 'location': job.get('location', ''),
+                 'url': job.get('jobUrl', '')}
+                for job in data.get('jobs', [])]
+    return []
+
+
+class AtsClient:
+    """Reads structured postings straight from ATS JSON feeds"""
+
+    def __init__(self, session, feed_base=None, timeout=10):
+        self.session = session
+        # Point every feed at another host (e.g. a local stub server) keeping the paths
+        self.feed_base = feed_base.rstrip('/') if feed_base else None
+        self.timeout = timeout
+
+    def feed_url(self, provider, token):
+        url = ATS_FEEDS[provider].format(token=token)
+        if self.feed_base:
+            parsed = urlparse(url)
+            url = f"{self.feed_base}{parsed.path}" + (f"?{parsed.query}" if parsed.query else '')
+        return url
+
+    def fetch_jobs(self, provider, token):
+        """Return normalised postings for a board, or [] if the feed can't be read"""
+        url = self.feed_url(provider, token)
+        try:
+            response = self.session.get(url, timeout=self.timeout, headers={'Accept': 'application/json'})
+            if response.status_code != 200:
+                logger.warning(f"{provider} feed for {token} returned {response.status_code}")
+                return []
+            jobs = parse_feed(provider, token, response.json())
+            logger.info(f"Read {len(jobs)} postings from {provider} board {token}")
+            return jobs
+        except Exception as e:
+            logger.error(f"Error reading {provider} feed for {token}: {e}")
+            return []
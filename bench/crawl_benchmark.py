@@ -0,0 +1,130 @@
+"""End-to-end crawler benchmark against the local fake web
+
+Usage:
+    python bench/crawl_benchmark.py [--scales 10 100 1000 10000] [--concurrency 16]
+
+For each scale a fresh fake web is served from this process and `JobCrawler.run`
+is executed in a child process (in an empty working directory, so no state is
+shared between runs). Reports companies/second, p50/p95 per-company latency
+and the child's peak RSS. Search-engine hosts are not throttled unless --polite
+is given, so the numbers reflect the crawler rather than the politeness delays.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from fake_web import FakeWeb, serve
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_worker(args):
+    """Child process: crawl the whole fake web once and print a JSON result"""
+    from job_crawler import JobCrawler
+    from transport import Resolver
+
+    logging.disable(logging.WARNING)
+    web = FakeWeb(args.companies, args.seed, args.slow_delay)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        web.write_csv('companies.csv')
+
+        crawler = JobCrawler(resolver=Resolver(args.connect_to, known_hosts=web.hosts))
+        if not args.polite:
+            crawler.scheduler.host_rates = {}
+
+        latencies = []
+        process_company = crawler.process_company
+
+        def timed_process_company(company_name):
+            start = time.perf_counter()
+            try:
+                return process_company(company_name)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+        crawler.process_company = timed_process_company
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = crawler.run('companies.csv', max_companies=args.companies, concurrency=args.concurrency)
+        elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        'companies': len(latencies),
+        'with_jobs': len(results),
+        'seconds': elapsed,
+        'companies_per_second': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        # ru_maxrss is in KiB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def run_scale(companies, args):
+    web = FakeWeb(companies, args.seed, args.slow_delay)
+    server = serve(web)
+    try:
+        host, port = server.httpd.server_address[:2]
+        command = [sys.executable, os.path.abspath(__file__), 'worker',
+                   '--companies', str(companies), '--connect-to', f"{host}:{port}",
+                   '--concurrency', str(args.concurrency), '--seed', str(args.seed),
+                   '--slow-delay', str(args.slow_delay)]
+        if args.polite:
+            command.append('--polite')
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result['requests'] = len(server.requests)
+        return result
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JobCrawler.run against a local fake web')
+    subparsers = parser.add_subparsers(dest='command')
+    worker = subparsers.add_parser('worker')
+    worker.add_argument('--companies', type=int, required=True)
+    worker.add_argument('--connect-to', required=True)
+
+    for p in (parser, worker):
+        p.add_argument('--concurrency', type=int, default=16)
+        p.add_argument('--seed', type=int, default=42)
+        p.add_argument('--slow-delay', type=float, default=0.5)
+        p.add_argument('--polite', action='store_true', help='Keep the real search-engine rate limits')
+    parser.add_argument('--scales', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    args = parser.parse_args()
+
+    if args.command == 'worker':
+        run_worker(args)
+        return
+
+    print(f"{'companies':>10} {'seconds':>9} {'comp/s':>8} {'p50 (s)':>8} {'p95 (s)':>8} "
+          f"{'peak MB':>8} {'requests':>9} {'with jobs':>10}")
+    for companies in args.scales:
+        r = run_scale(companies, args)
+        print(f"{r['companies']:>10} {r['seconds']:>9.1f} {r['companies_per_second']:>8.2f} {r['p50']:>8.3f} "
+              f"{r['p95']:>8.3f} {r['peak_rss_mb']:>8.1f} {r['requests']:>9} {r['with_jobs']:>10}")
+
+
+if __name__ == '__main__':
+    main()
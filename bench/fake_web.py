@@ -0,0 +1,264 @@
+"""Synthetic web of company sites for running the whole crawler offline
+
+Usage:
+    python bench/fake_web.py [--companies 100] [--port 8901] [--csv companies.csv]
+
+Writes the company list to --csv and serves every site, plus stand-in
+DuckDuckGo HTML, Wikipedia API and Wikidata API endpoints, from one local server. Point the
+crawler at it with CRAWLER_CONNECT_TO=127.0.0.1:8901 (host names and URLs stay
+as they are; only the connection target changes).
+
+Each company gets one of these kinds of site:
+    direct      found by the direct domain probes
+    redirect    apex domain redirects to www, /careers redirects to /jobs/
+    duckduckgo  only found through the DuckDuckGo results page
+    wikipedia   only found through its Wikipedia article: the Wikidata official
+                website for even-numbered companies, else the external links
+    slow        like direct, but every response is delayed
+    no_careers  homepage without any career page
+    dead        no website at all (its domains don't resolve)
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_server import StubServer
+
+KIND_WEIGHTS = {
+    'direct': 55,
+    'redirect': 10,
+    'duckduckgo': 10,
+    'wikipedia': 5,
+    'slow': 5,
+    'no_careers': 5,
+    'dead': 10,
+}
+
+NAME_WORDS = ['Apex', 'Birch', 'Cobalt', 'Delta', 'Ember', 'Fable', 'Granite', 'Harbour', 'Iris', 'Juniper',
+              'Kestrel', 'Lumen', 'Meridian', 'Nimbus', 'Orbit', 'Pioneer', 'Quarry', 'Raven', 'Summit', 'Tidal']
+SECTORS = ['Analytics', 'Logistics', 'Foods', 'Energy', 'Health', 'Media', 'Retail', 'Robotics', 'Finance', 'Studios']
+
+MATCHING_TITLES = ['Senior DevOps Engineer', 'Cloud Engineer', 'Infrastructure Engineer', 'DevOps Engineer']
+OTHER_TITLES = ['Account Manager', 'Data Analyst', 'Product Designer', 'Backend Developer', 'Office Manager',
+                'Marketing Executive', 'QA Engineer', 'Customer Success Lead', 'Payroll Specialist', 'Recruiter']
+
+FILLER = ("We build dependable products for customers across the UK and beyond. Our teams work in small, "
+          "autonomous squads and we care about craft, learning and a sustainable pace. ")
+
+HTML_HEADERS = {'Content-Type': 'text/html; charset=utf-8'}
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+class Company:
+    def __init__(self, index, rng):
+        self.index = index
+        self.name = f"{NAME_WORDS[index % len(NAME_WORDS)]} {SECTORS[index // len(NAME_WORDS) % len(SECTORS)]} {index} Ltd"
+        # Article titles leave the legal form out
+        self.title = self.name[:-len(' Ltd')]
+        self.item = f"Q{index + 1}"
+        self.slug = self.name.lower().replace(' ltd', '').replace(' ', '')
+        self.kind = rng.choices(list(KIND_WEIGHTS), weights=list(KIND_WEIGHTS.values()))[0]
+        self.hiring = rng.random() < 0.3
+        self.job_count = rng.randint(20, 120)
+        self.seed = rng.random()
+
+        if self.kind == 'duckduckgo':
+            self.domain = f"get{self.slug}.io"
+        elif self.kind == 'wikipedia':
+            self.domain = f"{self.slug}-hq.co.uk"
+        elif self.kind == 'redirect':
+            self.domain = f"{self.slug}.com"
+        elif self.kind == 'dead':
+            self.domain = None
+        else:
+            self.domain = f"{self.slug}.co.uk"
+
+    @property
+    def hosts(self):
+        if self.domain is None:
+            return []
+        if self.kind == 'redirect':
+            return [self.domain, f"www.{self.domain}"]
+        return [self.domain]
+
+
+class FakeWeb:
+    """Route handler serving every company site, chosen by the Host header
+
+    Construction is deterministic for a given (companies, seed), so another
+    process can rebuild the same web to learn its host names.
+    """
+
+    search_hosts = ('html.duckduckgo.com', 'en.wikipedia.org', 'www.wikidata.org')
+
+    def __init__(self, companies=100, seed=42, slow_delay=1.0, page_kb=80):
+        rng = random.Random(seed)
+        self.companies = [Company(i, rng) for i in range(companies)]
+        self.by_name = {c.name: c for c in self.companies}
+        self.by_host = {host: c for c in self.companies for host in c.hosts}
+        self.articles = {c.title: c for c in self.companies if c.kind == 'wikipedia'}
+        self.items = {c.item: c for c in self.articles.values()}
+        self.slow_delay = slow_delay
+        self.page_kb = page_kb
+
+    @property
+    def hosts(self):
+        return list(self.by_host) + list(self.search_hosts)
+
+    def write_csv(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Company'])
+            for company in self.companies:
+                writer.writerow([company.name])
+
+    def __call__(self, handler):
+        host = (handler.headers.get('Host') or '').split(':')[0].lower()
+        url = urlparse(handler.path)
+        query = parse_qs(url.query)
+
+        if host == 'html.duckduckgo.com':
+            return self.duckduckgo(query)
+        if host == 'en.wikipedia.org':
+            return self.wikipedia(query)
+        if host == 'www.wikidata.org':
+            return self.wikidata(query)
+
+        company = self.by_host.get(host)
+        if company is None:
+            return 404, {'Content-Type': 'text/plain'}, 'not found'
+        if company.kind == 'slow':
+            time.sleep(self.slow_delay)
+        return self.site(company, host, url.path)
+
+    def site(self, company, host, path):
+        if company.kind == 'redirect':
+            if host == company.domain:
+                return 301, {'Location': f"https://www.{company.domain}{path}"}, ''
+            if path == '/careers':
+                return 302, {'Location': '/jobs/'}, ''
+            if path == '/jobs/':
+                return 200, HTML_HEADERS, self.careers_page(company)
+
+        if path == '/':
+            return 200, HTML_HEADERS, self.homepage(company)
+        if path == '/careers' and company.kind != 'no_careers':
+            return 200, HTML_HEADERS, self.careers_page(company)
+        if path == '/about':
+            return 200, HTML_HEADERS, self.homepage(company)
+        return 404, HTML_HEADERS, '<html><body><h1>Page not found</h1></body></html>'
+
+    def homepage(self, company):
+        careers_link = '' if company.kind == 'no_careers' else '<li><a href="/careers">Careers</a></li>'
+        return (
+            f"<html><head><title>{company.name}</title><script>var analytics = {{}};</script></head><body>"
+            f"<header><h1>{company.name}</h1><nav><ul><li><a href=\"/about\">About us</a></li>"
+            f"<li><a href=\"/contact\">Contact</a></li>{careers_link}</ul></nav></header>"
+            f"<main>{''.join(f'<p>{FILLER}</p>' for _ in range(20))}</main>"
+            f"<footer>&copy; {company.name}</footer></body></html>"
+        )
+
+    def careers_page(self, company):
+        rng = random.Random(company.seed)
+        titles = [rng.choice(OTHER_TITLES) for _ in range(company.job_count)]
+        if company.hiring:
+            titles[rng.randrange(len(titles))] = rng.choice(MATCHING_TITLES)
+
+        jobs = ''.join(
+            f"<div class=\"job\"><h3>{title}</h3><p>London, UK &middot; Full time</p>"
+            f"<p>{FILLER[:rng.randint(60, len(FILLER))]}</p><a href=\"/careers/{i}\">Apply</a></div>"
+            for i, title in enumerate(titles)
+        )
+        page = (
+            f"<html><head><title>Careers at {company.name}</title><style>.job {{ margin: 1em; }}</style></head>"
+            f"<body><h1>Join {company.name}</h1><section>{jobs}</section>"
+        )
+        # Pad to a realistic page size with markup that doesn't hold job titles
+        padding = max(0, self.page_kb * 1024 - len(page))
+        return page + f"<script>var state = \"{'x' * padding}\";</script></body></html>"
+
+    def duckduckgo(self, query):
+        q = query.get('q', [''])[0]
+        company = self.by_name.get(q.replace(' official website UK', ''))
+        results = ['https://www.linkedin.com/company/example']
+        if company is not None and company.domain is not None and company.kind != 'wikipedia':
+            results.append(f"https://{company.hosts[-1]}/")
+        links = ''.join(f'<div class="result"><a class="result__url" href="{url}">{url}</a></div>' for url in results)
+        return 200, HTML_HEADERS, f"<html><body>{links}</body></html>"
+
+    def wikipedia(self, query):
+        # Answers formatversion=2 queries, up to 50 '|'-separated titles each
+        if query.get('list') == ['search']:
+            name = query.get('srsearch', [''])[0].replace(' company UK', '')
+            company = self.by_name.get(name)
+            search = [{'title': company.title}] if company is not None and company.kind == 'wikipedia' else []
+            return 200, JSON_HEADERS, json.dumps({'query': {'search': search}})
+
+        titles = query.get('titles', [''])[0].split('|')[:50]
+        props = query.get('prop', [''])[0].split('|')
+        pages = []
+        for title in dict.fromkeys(titles):
+            company = self.articles.get(title)
+            if company is None:
+                pages.append({'ns': 0, 'title': title, 'missing': True})
+                continue
+            page = {'pageid': company.index + 1, 'ns': 0, 'title': title}
+            if 'pageprops' in props:
+                page['pageprops'] = {'wikibase_item': company.item}
+            if 'externallinks' in props:
+                page['externallinks'] = [{'url': 'https://twitter.com/example'},
+                                         {'url': f"https://{company.domain}/?utm_source=wikipedia"}]
+            pages.append(page)
+        return 200, JSON_HEADERS, json.dumps({'batchcomplete': True, 'query': {'pages': pages}})
+
+    def wikidata(self, query):
+        entities = {}
+        for item in query.get('ids', [''])[0].split('|')[:50]:
+            company = self.items.get(item)
+            if company is None:
+                entities[item] = {'id': item, 'missing': ''}
+                continue
+            claims = {}
+            if company.index % 2 == 0:
+                claims['P856'] = [{'mainsnak': {'snaktype': 'value', 'property': 'P856',
+                                                'datavalue': {'value': f"https://{company.domain}/", 'type': 'string'}},
+                                   'rank': 'normal'}]
+            entities[item] = {'id': item, 'claims': claims}
+        return 200, JSON_HEADERS, json.dumps({'entities': entities})
+
+
+def serve(web, host='127.0.0.1', port=0):
+    """Start a StubServer answering every path with `web`"""
+    return StubServer({}, host=host, port=port, default=web).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a synthetic web of company sites')
+    parser.add_argument('--companies', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--port', type=int, default=8901)
+    parser.add_argument('--csv', default='companies.csv', help='Where to write the company list')
+    parser.add_argument('--slow-delay', type=float, default=1.0)
+    args = parser.parse_args()
+
+    web = FakeWeb(args.companies, args.seed, args.slow_delay)
+    web.write_csv(args.csv)
+    server = serve(web, port=args.port)
+    host, port = server.httpd.server_address[:2]
+    print(f"Serving {len(web.companies)} companies on {server.url}; "
+          f"run with CRAWLER_CONNECT_TO={host}:{port} EXCEL_FILE={args.csv}")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Compare the BeautifulSoup/html.parser path with the pluggable lxml backend
+
+Usage:
+    python bench/parser_benchmark.py save URL [URL ...]   # record career pages into the corpus
+    python bench/parser_benchmark.py run [--repeat N]     # time both paths on the corpus
+
+If the corpus directory is empty, `run` generates synthetic career pages so the
+benchmark can still be used offline.
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import sys
+import time
+
+import requests
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_matcher import KeywordMatcher
+from page_parser import LxmlParser, SoupParser
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+JOB_KEYWORDS = [
+    'devops engineer',
+    'senior devops engineer',
+    'cloud engineer',
+    'senior cloud engineer',
+    'infrastructure engineer',
+    'senior infrastructure engineer'
+]
+TAGS = ['div', 'li', 'h3', 'h4', 'p']
+
+
+def save_pages(urls):
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    for url in urls:
+        try:
+            response = requests.get(url, timeout=15)
+            name = hashlib.sha1(url.encode()).hexdigest()[:12] + '.html'
+            with open(os.path.join(CORPUS_DIR, name), 'wb') as f:
+                f.write(response.content)
+            print(f"saved {url} -> {name} ({len(response.content)} bytes)")
+        except Exception as e:
+            print(f"failed {url}: {e}")
+
+
+def synthetic_page(rng, jobs=200):
+    """A career page shaped like a typical ATS listing: nav, scripts, a long job list"""
+    titles = ['Software Engineer', 'Data Analyst', 'Cloud Engineer', 'Senior DevOps Engineer',
+              'Account Manager', 'Infrastructure Engineer', 'Product Designer', 'Nurse']
+    script = '<script>' + 'var config = {"a": 1, "b": [1, 2, 3]};' * 200 + '</script>'
+    nav = ''.join(f'<li><a href="/section-{i}">Section {i}</a></li>' for i in range(60))
+    listing = ''.join(
+        f'<div class="job"><h3><a href="/jobs/{i}">{rng.choice(titles)}</a></h3>'
+        f'<p>London, UK &middot; Full time</p><p>{"Lorem ipsum dolor sit amet. " * 8}</p></div>'
+        for i in range(jobs)
+    )
+    return (f'<html><head><title>Careers</title><style>{"body{margin:0}" * 100}</style>{script}</head>'
+            f'<body><nav><ul>{nav}</ul></nav><main>{listing}</main>{script}</body></html>').encode()
+
+
+def load_corpus():
+    pages = []
+    if os.path.isdir(CORPUS_DIR):
+        for name in sorted(os.listdir(CORPUS_DIR)):
+            if name.endswith('.html'):
+                with open(os.path.join(CORPUS_DIR, name), 'rb') as f:
+                    pages.append(f.read())
+    if not pages:
+        rng = random.Random(0)
+        pages = [synthetic_page(rng, jobs=rng.randint(20, 400)) for _ in range(20)]
+        print(f"corpus empty, using {len(pages)} synthetic pages")
+    return pages
+
+
+def original_path(content):
+    """What verify_company_website/find_career_pages/check_job_openings used to do"""
+    soup = BeautifulSoup(content, 'html.parser')
+    page_text = soup.get_text().lower()
+    soup = BeautifulSoup(content, 'html.parser')
+    links = [(a.get('href', ''), a.get_text()) for a in soup.find_all('a', href=True)]
+    soup = BeautifulSoup(content, 'html.parser')
+    # check_job_openings extracted the text once and tested every keyword against it
+    job_text = soup.get_text().lower()
+    found = []
+    for keyword in JOB_KEYWORDS:
+        if keyword in job_text:
+            if soup.find_all(TAGS, string=re.compile(keyword, re.IGNORECASE)):
+                found.append(keyword)
+    return page_text, links, found
+
+
+def backend_path(parser, matcher, content):
+    """What the crawler does now: shared visible text, links, then scan_texts only if a keyword occurs"""
+    text = parser.visible_text(content).lower()
+    links = parser.links(content)
+    jobs = {}
+    if matcher.search(text):
+        jobs = matcher.scan_texts(parser.element_strings(parser.parse(content), TAGS))
+    found = matcher.ordered({keyword for keywords in jobs.values() for keyword in keywords})
+    return text, links, found
+
+
+def timed(fn, pages, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in pages:
+            fn(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(repeat):
+    pages = load_corpus()
+    total_bytes = sum(len(p) for p in pages)
+    matcher = KeywordMatcher(JOB_KEYWORDS)
+    soup_parser = SoupParser()
+    lxml_parser = LxmlParser()
+
+    print(f"{len(pages)} pages, {total_bytes / 1024:.0f} KiB, best of {repeat}")
+    rows = [
+        ('original BeautifulSoup path', lambda c: original_path(c)),
+        ('backend: html.parser', lambda c: backend_path(soup_parser, matcher, c)),
+        ('backend: lxml', lambda c: backend_path(lxml_parser, matcher, c)),
+        ('lxml visible_text only', lxml_parser.visible_text),
+        ('lxml links only', lxml_parser.links),
+    ]
+    baseline = None
+    for label, fn in rows:
+        elapsed = timed(fn, pages, repeat)
+        baseline = baseline or elapsed
+        print(f"{label:32s} {elapsed * 1000:9.1f} ms  {total_bytes / elapsed / 1e6:7.1f} MB/s  "
+              f"x{baseline / elapsed:.1f}")
+
+    # The fast paths must find the same jobs as the original code
+    for content in pages:
+        assert original_path(content)[2] == backend_path(lxml_parser, matcher, content)[2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    save = sub.add_parser('save', help='record pages into the corpus')
+    save.add_argument('urls', nargs='+')
+    bench = sub.add_parser('run', help='time the parser paths')
+    bench.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == 'save':
+        save_pages(args.urls)
+    else:
+        run(args.repeat)
+
+
+if __name__ == '__main__':
+    main()
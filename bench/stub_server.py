@@ -0,0 +1,188 @@
+"""Local HTTP stub server for exercising the crawler offline
+
+Usage:
+    python bench/stub_server.py ats [--port 8900]
+    python bench/stub_server.py telegram [--port 8900]
+
+`ats` serves the recorded feeds in bench/fixtures/ats (board token "acme");
+point the crawler at it with ATS_FEED_BASE=http://127.0.0.1:8900.
+
+`telegram` is a fake Bot API that prints received messages and answers bursts
+with 429 + retry_after like the real one; use TELEGRAM_API_BASE=http://127.0.0.1:8900
+and TELEGRAM_BOT_TOKEN=TEST.
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# An "&" that doesn't start an entity, which Telegram's HTML parse mode rejects
+BARE_AMPERSAND = re.compile(r'&(?!(?:amp|lt|gt|quot|#\d+|#x[0-9a-f]+);)', re.I)
+
+# Feed path (as built by ats.AtsClient.feed_url for token "acme") -> recorded response
+ATS_ROUTES = {
+    '/v1/boards/acme/jobs': 'greenhouse.json',
+    '/v0/postings/acme': 'lever.json',
+    '/api/v1/widget/accounts/acme': 'workable.json',
+    '/v1/companies/acme/postings': 'smartrecruiters.json',
+    '/posting-api/job-board/acme': 'ashby.json',
+}
+
+
+class StubServer:
+    """Serves canned responses from a route table on a background thread
+
+    `routes` maps a path (without query string) to either a
+    (status, headers, body) tuple or a callable taking the request handler and
+    returning one. `default` answers paths missing from `routes` (404 if None).
+    """
+
+    def __init__(self, routes, host='127.0.0.1', port=0, default=None):
+        self.routes = routes
+        self.default = default
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _respond(self, send_body):
+                path = urlparse(self.path).path
+                server.requests.append((self.command, self.path))
+                route = server.routes.get(path, server.default)
+                if route is None:
+                    status, headers, body = 404, {'Content-Type': 'text/plain'}, b'not found'
+                elif callable(route):
+                    status, headers, body = route(self)
+                else:
+                    status, headers, body = route
+                if isinstance(body, str):
+                    body = body.encode('utf-8')
+
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                self._respond(True)
+
+            def do_HEAD(self):
+                self._respond(False)
+
+            def do_POST(self):
+                self._respond(True)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def load_fixture(*parts):
+    with open(os.path.join(FIXTURES_DIR, *parts), 'rb') as f:
+        return f.read()
+
+
+def ats_routes():
+    """Routes serving the recorded ATS feeds"""
+    return {
+        path: (200, {'Content-Type': 'application/json'}, load_fixture('ats', name))
+        for path, name in ATS_ROUTES.items()
+    }
+
+
+class FakeBotApi:
+    """sendMessage handler that enforces a per-chat rate limit like Telegram does
+
+    HTML messages with a bare "&" are answered with 400, as Telegram can't parse their entities.
+    """
+
+    def __init__(self, messages_per_second=1, verbose=False):
+        self.min_interval = 1.0 / messages_per_second
+        self.verbose = verbose
+        self.messages = []
+        self.rejected = 0
+        self._last_sent = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, handler):
+        length = int(handler.headers.get('Content-Length', 0))
+        form = parse_qs(handler.rfile.read(length).decode('utf-8'))
+        text = form.get('text', [''])[0]
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_sent < self.min_interval:
+                self.rejected += 1
+                body = {'ok': False, 'error_code': 429,
+                        'description': 'Too Many Requests: retry after 1',
+                        'parameters': {'retry_after': 1}}
+                return 429, {'Content-Type': 'application/json'}, json.dumps(body)
+            if len(text) > 4096:
+                body = {'ok': False, 'error_code': 400, 'description': 'Bad Request: message is too long'}
+                return 400, {'Content-Type': 'application/json'}, json.dumps(body)
+            if form.get('parse_mode') == ['HTML'] and BARE_AMPERSAND.search(text):
+                self.rejected += 1
+                body = {'ok': False, 'error_code': 400, 'description': "Bad Request: can't parse entities"}
+                return 400, {'Content-Type': 'application/json'}, json.dumps(body)
+            self._last_sent = now
+            self.messages.append(text)
+        if self.verbose:
+            print(f"--- message {len(self.messages)} ({len(text)} chars) ---\n{text}")
+        body = {'ok': True, 'result': {'message_id': len(self.messages), 'text': text}}
+        return 200, {'Content-Type': 'application/json'}, json.dumps(body)
+
+
+def telegram_routes(bot_api, token='TEST'):
+    """Routes for a fake Bot API answering sendMessage for `token`"""
+    return {f'/bot{token}/sendMessage': bot_api}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve recorded fixtures for offline crawler runs')
+    parser.add_argument('fixtures', choices=['ats', 'telegram'])
+    parser.add_argument('--port', type=int, default=8900)
+    args = parser.parse_args()
+
+    routes = ats_routes() if args.fixtures == 'ats' else telegram_routes(FakeBotApi(verbose=True))
+    server = StubServer(routes, port=args.port)
+    print(f"Serving {args.fixtures} fixtures on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
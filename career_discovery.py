@@ -0,0 +1,202 @@
+import json
+import logging
+import re
+import xml.etree.ElementTree as ET
+import zlib
+from contextlib import closing
+from urllib.parse import urljoin, urlparse
+
+from website_cache import SqliteCache
+
+logger = logging.getLogger(__name__)
+
+# Whole URL-path or anchor-text words and how strongly they point at a careers page
+CAREER_TERMS = {
+    'careers': 3, 'career': 3, 'jobs': 3, 'vacancies': 3, 'vacancy': 2, 'job': 2,
+    'recruitment': 2, 'hiring': 2, 'opportunities': 1, 'employment': 1, 'positions': 1,
+}
+CAREER_PHRASES = {'work-with-us': 3, 'work-for-us': 3, 'join-our-team': 3, 'join-us': 2}
+# Pages that mention jobs without listing any ("/blog/job-market-trends")
+NEGATIVE_TERMS = {'blog', 'news', 'press', 'article', 'articles', 'post', 'posts', 'tag', 'category',
+                  'event', 'events', 'insights', 'product', 'products', 'privacy', 'cookies'}
+
+# A link scoring this much (e.g. "Careers" pointing at /careers) is taken without reading sitemaps
+STRONG_SCORE = 4
+MIN_SCORE = 2
+
+# robots.txt files are small; anything past this is not worth reading
+ROBOTS_MAX_BYTES = 256 * 1024
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+SITEMAP_LINE_PATTERN = re.compile(r'^\s*sitemap\s*:\s*(\S+)', re.IGNORECASE | re.MULTILINE)
+
+
+def _term_score(words, text):
+    score = sum(CAREER_TERMS.get(word, 0) for word in set(words))
+    score += sum(weight for phrase, weight in CAREER_PHRASES.items() if phrase in text)
+    score -= 2 * len(NEGATIVE_TERMS.intersection(words))
+    return score
+
+
+def score_career_url(url, anchor=''):
+    """How likely a URL (and the text of a link to it) is a careers page
+
+    Matches whole words rather than substrings, so "/jobson-family" scores
+    nothing, and prefers shallow listing pages to deep ones.
+    """
+    parsed = urlparse(url.lower())
+    path = parsed.path.replace('_', '-')
+    words = WORD_PATTERN.findall(path)
+    score = _term_score(words, path)
+
+    # careers.example.com, jobs.example.com
+    subdomain = parsed.hostname.split('.')[0] if parsed.hostname else ''
+    score += CAREER_TERMS.get(subdomain, 0)
+
+    if anchor:
+        text = '-'.join(WORD_PATTERN.findall(anchor.lower()))
+        score += _term_score(text.split('-'), text)
+
+    depth = len([segment for segment in parsed.path.split('/') if segment])
+    return score - 0.5 * max(0, depth - 1)
+
+
+class CareerPageCache(SqliteCache):
+    """On-disk cache of domain -> discovered career page URLs, with negative caching"""
+
+    table = 'career_pages'
+    key = 'domain'
+    columns = (('urls', 'TEXT NOT NULL'), ('source', 'TEXT NOT NULL'))
+    stamp = 'discovered_at'
+
+    def __init__(self, path='career_pages.sqlite', ttl_days=7, negative_ttl_days=1):
+        super().__init__(path, ttl_days, negative_ttl_days)
+
+    @staticmethod
+    def domain(url):
+        return (urlparse(url).hostname or '').lower()
+
+    def is_miss(self, values):
+        return not json.loads(values[0])
+
+    def get(self, url):
+        """Cached career page URLs for a site, or None on a miss or expired entry"""
+        row = self.get_values(self.domain(url))
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, url, career_urls, source):
+        self.put_values([(self.domain(url), json.dumps(career_urls), source)], f"career pages for {url}")
+
+
+class SitemapReader:
+    """Finds career URLs in a site's sitemaps without holding them in memory
+
+    Sitemaps come from robots.txt `Sitemap:` lines, falling back to
+    /sitemap.xml. They are streamed and parsed incrementally, gzipped or not,
+    and sitemap indexes are followed into their most promising children, up to
+    `max_sitemaps` files and `max_bytes` decompressed bytes per site between
+    them. Reading stops at the first URL scoring STRONG_SCORE.
+    """
+
+    def __init__(self, session, max_sitemaps=4, max_bytes=2 * 1024 * 1024, timeout=15, metrics=None):
+        self.session = session
+        self.max_sitemaps = max_sitemaps
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        # Streamed bodies aren't seen by the session's response hook, so their bytes are counted here
+        self.metrics = metrics
+
+    def stream(self, url):
+        """Yield the body of a 200 response chunk by chunk, counting the bytes downloaded"""
+        response = self.session.get(url, timeout=self.timeout, stream=True)
+        try:
+            if response.status_code != 200:
+                return
+            for chunk in response.iter_content(64 * 1024):
+                if self.metrics is not None and not getattr(response, 'not_modified', False):
+                    self.metrics.inc('crawler_bytes_downloaded_total', len(chunk))
+                yield chunk
+        finally:
+            response.close()
+
+    def sitemap_urls(self, base_url):
+        """Sitemaps listed in robots.txt, or the conventional /sitemap.xml"""
+        try:
+            body = b''
+            with closing(self.stream(urljoin(base_url, '/robots.txt'))) as chunks:
+                for chunk in chunks:
+                    body += chunk[:ROBOTS_MAX_BYTES - len(body)]
+                    if len(body) >= ROBOTS_MAX_BYTES:
+                        break
+            listed = [urljoin(base_url, url) for url in SITEMAP_LINE_PATTERN.findall(body.decode('utf-8', 'ignore'))]
+            if listed:
+                return list(dict.fromkeys(listed))
+        except Exception as e:
+            logger.debug(f"Could not read robots.txt for {base_url}: {e}")
+        return [urljoin(base_url, '/sitemap.xml')]
+
+    def candidates(self, base_url):
+        """{url: score} for sitemap URLs scoring at least MIN_SCORE, and whether any sitemap was found"""
+        queue = self.sitemap_urls(base_url)
+        found_sitemap = False
+        scored = {}
+        fetched = 0
+        budget = {'bytes': self.max_bytes}
+
+        while queue and fetched < self.max_sitemaps and budget['bytes'] > 0:
+            sitemap_url = queue.pop(0)
+            fetched += 1
+            children = []
+            strong = False
+            try:
+                with closing(self.read(sitemap_url, budget)) as entries:
+                    for kind, loc in entries:
+                        found_sitemap = True
+                        if kind == 'sitemap':
+                            children.append(loc)
+                            continue
+                        score = score_career_url(loc)
+                        if score >= MIN_SCORE:
+                            scored[loc] = max(score, scored.get(loc, score))
+                        if score >= STRONG_SCORE:
+                            strong = True
+                            break
+            except Exception as e:
+                logger.debug(f"Could not read sitemap {sitemap_url}: {e}")
+            if strong:
+                break
+
+            # Index files: job/career sitemaps first, then the rest in listed order
+            children.sort(key=lambda url: -score_career_url(url))
+            queue = children + queue
+
+        return scored, found_sitemap
+
+    def read(self, sitemap_url, budget):
+        """Yield ('url' | 'sitemap', loc) pairs from a sitemap or sitemap index
+
+        Stops once `budget['bytes']`, shared by every sitemap of a site, is used up.
+        """
+        parser = ET.XMLPullParser(events=('end',))
+        decompressor = None
+        with closing(self.stream(sitemap_url)) as chunks:
+            for chunk in chunks:
+                # .xml.gz files arrive as raw gzip, unlike Content-Encoding: gzip
+                if decompressor is None:
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if chunk[:2] == b'\x1f\x8b' else False
+                if decompressor:
+                    chunk = decompressor.decompress(chunk, budget['bytes'])
+                else:
+                    chunk = chunk[:budget['bytes']]
+                budget['bytes'] -= len(chunk)
+                parser.feed(chunk)
+                for _, element in parser.read_events():
+                    tag = element.tag.rsplit('}', 1)[-1]
+                    if tag in ('url', 'sitemap'):
+                        loc = next((child.text for child in element if child.tag.rsplit('}', 1)[-1] == 'loc'), None)
+                        if loc:
+                            yield tag, loc.strip()
+                        element.clear()
+                if budget['bytes'] <= 0:
+                    logger.debug(f"Stopped reading {sitemap_url}: sitemap byte budget used up")
+                    return
@@ -0,0 +1,96 @@
+import hashlib
+import logging
+import time
+
+from sqlite_store import SqliteStore
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(text, seed=0):
+    """64-bit hash of whitespace-normalised text, stored as a signed SQLite integer
+
+    A non-zero `seed` (e.g. KeywordMatcher.signature) is mixed in, so the same
+    text fingerprints differently once the keywords it was scanned for change.
+    """
+    normalised = ' '.join(text.split()).lower()
+    digest = hashlib.blake2b(digest_size=8)
+    if seed:
+        digest.update(seed.to_bytes(8, 'big', signed=True))
+    digest.update(normalised.encode('utf-8'))
+    return int.from_bytes(digest.digest(), 'big', signed=True)
+
+
+class ChangeDetector(SqliteStore):
+    """Remembers career-page fingerprints and job titles already alerted on
+
+    Only 8-byte hashes are stored per page and per title, so the database stays
+    small for tens of thousands of monitored pages.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS companies (
+            id INTEGER PRIMARY KEY,
+            name TEXT UNIQUE NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            fingerprint INTEGER NOT NULL,
+            matcher INTEGER,
+            checked_at REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS seen_titles (
+            company_id INTEGER NOT NULL,
+            title_hash INTEGER NOT NULL,
+            first_seen REAL NOT NULL,
+            PRIMARY KEY (company_id, title_hash)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path='page_fingerprints.sqlite'):
+        super().__init__(path)
+
+    def migrate(self):
+        # Databases from before `matcher` was recorded: their pages are scanned again once
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(pages)")}
+        if 'matcher' not in columns:
+            self.conn.execute("ALTER TABLE pages ADD COLUMN matcher INTEGER")
+
+    def _company_id(self, company_name):
+        self.conn.execute("INSERT OR IGNORE INTO companies (name) VALUES (?)", (company_name,))
+        return self.conn.execute("SELECT id FROM companies WHERE name = ?", (company_name,)).fetchone()[0]
+
+    def page_changed(self, url, page_fingerprint):
+        """Whether the page differs from the last successful scan"""
+        with self._lock:
+            row = self.conn.execute("SELECT fingerprint FROM pages WHERE url = ?", (url,)).fetchone()
+        return row is None or row[0] != page_fingerprint
+
+    def scanned_with(self, url, matcher):
+        """Whether the page's last scan used the keyword matcher with this signature"""
+        with self._lock:
+            row = self.conn.execute("SELECT matcher FROM pages WHERE url = ?", (url,)).fetchone()
+        return row is not None and row[0] == matcher
+
+    def record_page(self, url, page_fingerprint, matcher=None):
+        """Remember a page's fingerprint, and the matcher it was scanned with, once it has been scanned"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (url, fingerprint, matcher, checked_at) VALUES (?, ?, ?, ?)",
+                (url, page_fingerprint, matcher, time.time())
+            )
+
+    def new_titles(self, company_name, titles):
+        """Return the titles not alerted on before for this company, and remember them"""
+        now = time.time()
+        new = []
+        with self._lock, self.conn:
+            company_id = self._company_id(company_name)
+            for title in titles:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO seen_titles (company_id, title_hash, first_seen) VALUES (?, ?, ?)",
+                    (company_id, fingerprint(title), now)
+                )
+                if cursor.rowcount:
+                    new.append(title)
+        return new
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import re
+
+from sqlite_store import SqliteStore
+
+logger = logging.getLogger(__name__)
+
+SUFFIXES = ['ltd', 'limited', 'plc', 'inc', 'corp', 'corporation', 'group', 'holdings', 'uk', 'technology', 'tech', 'digital', 'systems']
+
+# Every suffix in one alternation, compiled once; longest first so "technology" isn't cut to "nology"
+SUFFIX_PATTERN = re.compile(r'\b(?:' + '|'.join(sorted(SUFFIXES, key=len, reverse=True)) + r')\b')
+# Only the legal form, so "Acme Digital Ltd" and "Acme Systems Ltd" stay different companies
+LEGAL_FORMS = ['ltd', 'limited', 'plc', 'llp', 'inc', 'corp']
+LEGAL_FORM_PATTERN = re.compile(r'\b(?:' + '|'.join(LEGAL_FORMS) + r')\b')
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s-]')
+# Spaces and tabs only, so the newlines separating names in a batch survive
+SPACES_PATTERN = re.compile(r'[^\S\n]+')
+EDGES_PATTERN = re.compile(r'^[ -]+|[ -]+$', re.MULTILINE)
+
+# "Legal Name Ltd T/A Trading Name"; the trading name is what the website goes by
+TRADING_AS_PATTERN = re.compile(r'\b(?:t/a|t\\a|trading as)(?!\w)', re.IGNORECASE)
+# Keeps letters, digits and the punctuation that belongs in a company name
+DISPLAY_PATTERN = re.compile(r"[^\w\s&'.-]")
+
+
+class CompanyName:
+    """A company name prepared for website discovery
+
+    `search_name` is the name to search for and to look for on a candidate site
+    (the trading name of a "X Ltd T/A Y" entry, without stray punctuation);
+    `key` is its cleaned lower-case form without descriptive suffixes, used for
+    domains; `dedupe_key` drops only case, punctuation and the legal form, and
+    decides which rows are the same company.
+    """
+
+    def __init__(self, name, search_name, key, dedupe_key):
+        self.name = name
+        self.search_name = search_name
+        self.key = key
+        self.dedupe_key = dedupe_key
+
+
+def search_name(name):
+    """Trading name if the entry has one, else the name, without brackets and symbols"""
+    legal, *trading = TRADING_AS_PATTERN.split(name, maxsplit=1)
+    for candidate in trading + [legal]:
+        tidy = ' '.join(DISPLAY_PATTERN.sub(' ', candidate).split()).strip(" &'.-")
+        if any(c.isalnum() for c in tidy):
+            return tidy
+    return ''
+
+
+def clean_names(names, suffix_pattern=SUFFIX_PATTERN):
+    """Clean a whole column of names at once
+
+    The names are joined into one newline-separated block so each precompiled
+    pattern runs once over the column instead of once per name. Words matching
+    `suffix_pattern` are removed; None keeps every word.
+    """
+    if not names:
+        return []
+    block = '\n'.join(name.replace('\n', ' ') for name in names).lower()
+    if suffix_pattern is not None:
+        block = suffix_pattern.sub('', block)
+    block = PUNCTUATION_PATTERN.sub('', block)
+    block = SPACES_PATTERN.sub(' ', block)
+    block = EDGES_PATTERN.sub('', block)
+    return block.split('\n')
+
+
+def normalise_names(names):
+    """CompanyName for each name, in the same order"""
+    search_names = [search_name(name) for name in names]
+    keys = clean_names(search_names)
+    # A name made only of suffixes ("Digital Group Ltd") keeps them rather than vanishing
+    fallbacks = clean_names([name if not key else '' for name, key in zip(search_names, keys)], suffix_pattern=None)
+    dedupe_keys = clean_names(search_names, LEGAL_FORM_PATTERN)
+    return [CompanyName(name, search, key or fallback, dedupe_key or key or fallback)
+            for name, search, key, fallback, dedupe_key in zip(names, search_names, keys, fallbacks, dedupe_keys)]
+
+
+class CompanyIndex(SqliteStore):
+    """On-disk index of normalised company names and their candidate domains
+
+    Built in one batch from the company list, so crawling a company only looks
+    up its search name and domains. Companies whose names differ from an
+    earlier row only in case, punctuation or legal form are marked as
+    duplicates of it, and names with nothing left after cleaning (e.g. "@@@")
+    have an empty key.
+    """
+
+    # Bumped when normalisation changes, so existing indexes are rebuilt
+    version = 2
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS companies (
+            name TEXT PRIMARY KEY,
+            search_name TEXT NOT NULL,
+            key TEXT NOT NULL,
+            domains TEXT NOT NULL,
+            duplicate_of TEXT
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS companies_key ON companies (key);
+        CREATE TABLE IF NOT EXISTS sources (
+            path TEXT PRIMARY KEY,
+            signature TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path='company_index.sqlite'):
+        super().__init__(path)
+
+    @staticmethod
+    def signature(path, extensions):
+        # Content rather than mtime, which a fresh checkout resets every run
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return json.dumps([digest.hexdigest(), list(extensions), CompanyIndex.version])
+
+    def build(self, source, candidate_domains, extensions=()):
+        """Index every company in a CompanySource, unless it is unchanged since the last build
+
+        `candidate_domains(key, search_name)` returns a company's domains in
+        priority order; `extensions` is part of the signature so changing the
+        domain extensions rebuilds the index.
+        """
+        try:
+            signature = self.signature(source.path, extensions)
+            with self._lock:
+                row = self.conn.execute("SELECT signature FROM sources WHERE path = ?", (source.path,)).fetchone()
+            if row is not None and row[0] == signature:
+                return
+
+            names = list(dict.fromkeys(name for _, name in source.iter_companies()))
+            rows = []
+            first_by_key = {}
+            for company in normalise_names(names):
+                duplicate_of = first_by_key.setdefault(company.dedupe_key, company.name) if company.key else None
+                rows.append((company.name, company.search_name, company.key,
+                             json.dumps(candidate_domains(company.key, company.search_name) if company.key else []),
+                             duplicate_of if duplicate_of != company.name else None))
+
+            with self._lock, self.conn:
+                self.conn.execute("DELETE FROM companies")
+                self.conn.executemany(
+                    "INSERT INTO companies (name, search_name, key, domains, duplicate_of) VALUES (?, ?, ?, ?, ?)", rows
+                )
+                self.conn.execute("INSERT OR REPLACE INTO sources (path, signature) VALUES (?, ?)",
+                                  (source.path, signature))
+
+            duplicates = sum(1 for row in rows if row[4] is not None)
+            unusable = sum(1 for row in rows if not row[2])
+            logger.info(f"Indexed {len(rows)} companies ({duplicates} duplicates, {unusable} without a usable name)")
+        except Exception as e:
+            logger.error(f"Error building company index: {e}")
+
+    def get(self, company_name):
+        """(search name, key, candidate domains) for an indexed company, or None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT search_name, key, domains FROM companies WHERE name = ?", (company_name,)
+            ).fetchone()
+        if row is None:
+            return None
+        search, key, domains = row
+        return search, key, json.loads(domains)
+
+    def skip(self, company_name):
+        """Whether a company is a duplicate of an earlier one or has no usable name"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT key, duplicate_of FROM companies WHERE name = ?", (company_name,)
+            ).fetchone()
+        return row is not None and (not row[0] or row[1] is not None)
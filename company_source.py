@@ -0,0 +1,114 @@
+import csv
+import json
+import logging
+import os
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+
+class CompanySource:
+    """Lazily reads company names from an .xlsx, .csv or .jsonl file
+
+    Names come from the first column (after a header row for spreadsheets and
+    CSV). A persisted cursor remembers where the previous run stopped.
+    """
+
+    def __init__(self, path, cursor_file='company_cursor.json'):
+        self.path = path
+        self.cursor_file = cursor_file
+        self.offset = self.load_cursor()
+
+    def load_cursor(self):
+        try:
+            if os.path.exists(self.cursor_file):
+                with open(self.cursor_file, 'r') as f:
+                    cursor = json.load(f)
+                # A different input file starts from the top
+                if cursor.get('source') == os.path.basename(self.path):
+                    return cursor.get('offset', 0)
+        except Exception as e:
+            logger.error(f"Error loading company cursor: {e}")
+        return 0
+
+    def save_cursor(self):
+        try:
+            with open(self.cursor_file, 'w') as f:
+                json.dump({'source': os.path.basename(self.path), 'offset': self.offset}, f)
+        except Exception as e:
+            logger.error(f"Error saving company cursor: {e}")
+
+    def iter_companies(self, offset=0):
+        """Yield (row_index, company_name) pairs starting at data row `offset`"""
+        ext = os.path.splitext(self.path)[1].lower()
+        if ext in ('.xlsx', '.xlsm'):
+            rows = self._iter_excel(offset)
+        elif ext == '.csv':
+            rows = self._iter_csv(offset)
+        elif ext == '.jsonl':
+            rows = self._iter_jsonl(offset)
+        else:
+            raise ValueError(f"Unsupported company list format: {self.path}")
+
+        for index, value in enumerate(rows, start=offset):
+            if value is None:
+                continue
+            name = value if isinstance(value, str) else str(value)
+            if name.strip():
+                yield index, name
+
+    def _iter_excel(self, offset):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(self.path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            # Row 1 is the header; data row 0 is sheet row 2
+            for row in sheet.iter_rows(min_row=offset + 2, max_col=1, values_only=True):
+                yield row[0] if row else None
+        finally:
+            workbook.close()
+
+    def _iter_csv(self, offset):
+        with open(self.path, 'r', newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            for row in islice(reader, offset, None):
+                yield row[0] if row else None
+
+    def _iter_jsonl(self, offset):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in islice(f, offset, None):
+                line = line.strip()
+                if not line:
+                    yield None
+                    continue
+                record = json.loads(line)
+                if isinstance(record, dict):
+                    record = record.get('company', record.get('name'))
+                yield record
+
+    def take(self, limit, skip=None):
+        """Return up to `limit` companies from the cursor onwards and advance it
+
+        `skip(name)` filters out companies that shouldn't use up the budget.
+        The cursor stays at the end of the list once it gets there, so only
+        rows appended later are picked up (revisits come from the recrawl queue).
+        """
+        picked = []
+        seen = set()
+        offset = self.offset
+        if limit <= 0:
+            return picked
+
+        for index, name in self.iter_companies(offset):
+            offset = index + 1
+            if name in seen or (skip is not None and skip(name)):
+                continue
+            picked.append(name)
+            seen.add(name)
+            if len(picked) >= limit:
+                break
+
+        self.offset = offset
+        return picked
@@ -0,0 +1,123 @@
+import logging
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from transport import Resolver
+
+logger = logging.getLogger(__name__)
+
+# Anything that can't appear in a host name label
+NON_LABEL_PATTERN = re.compile(r'[^\w-]|_')
+
+
+class DomainResolver:
+    """Finds a company's website by probing candidate domains in parallel"""
+
+    extensions = ['.com', '.co.uk', '.uk', '.org']
+
+    def __init__(self, head, verify, max_workers=32, dns_timeout=3.0, probe_timeout=8, resolver=None, dns_workers=16):
+        # Callable (url, timeout, allow_redirects) -> HEAD status code
+        self.head = head
+        # Callable (url, company_name) -> bool that confirms the site belongs to the company
+        self.verify = verify
+        self.resolver = resolver or Resolver()
+        self.dns_timeout = dns_timeout
+        self.probe_timeout = probe_timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='resolve')
+        # Lookups get their own pool so they never queue behind slow probes
+        self.dns_executor = ThreadPoolExecutor(max_workers=dns_workers, thread_name_prefix='dns')
+
+    def candidate_domains(self, clean_name, original_name):
+        """Build candidate domains in priority order"""
+        variations = [
+            clean_name.replace(' ', ''),
+            clean_name.replace(' ', '-'),
+            original_name.lower().replace(' ', ''),
+            original_name.lower().replace(' ', '-'),
+            ''.join(word[0] for word in clean_name.split()),  # acronym
+        ]
+
+        variations = (NON_LABEL_PATTERN.sub('', variation).strip('-') for variation in variations)
+        # dict keeps the first occurrence of each domain, in priority order
+        return list(dict.fromkeys(f"{variation}{ext}" for variation in variations if variation
+                                  for ext in self.extensions))
+
+    def resolves(self, domain):
+        """Check whether a domain has a DNS record"""
+        return self.resolver.resolves(domain)
+
+    def filter_resolvable(self, domains):
+        """Resolve all domains concurrently and keep the live ones, in the original order
+
+        Each lookup gets `dns_timeout` seconds from when it starts, not from
+        when it was queued; lookups still pending after that are cancelled and
+        treated as dead.
+        """
+        started = {}
+
+        def lookup(domain):
+            started[domain] = time.monotonic()
+            return self.resolves(domain)
+
+        futures = [self.dns_executor.submit(lookup, domain) for domain in domains]
+        # Bounds the total wait when the pool is busy with other companies' lookups
+        give_up = time.monotonic() + 4 * self.dns_timeout
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            waiting = [domain for domain, future in zip(domains, futures) if future in pending]
+            expiries = [started[domain] + self.dns_timeout for domain in waiting if domain in started]
+            if now >= give_up or (len(expiries) == len(waiting) and max(expiries) <= now):
+                break
+            # Queued lookups haven't started their clock yet, so check back on them shortly
+            wake = [expiry for expiry in expiries if expiry > now]
+            if len(expiries) < len(waiting):
+                wake.append(now + self.dns_timeout / 10)
+            _, pending = wait(pending, timeout=min(wake + [give_up]) - now, return_when=FIRST_COMPLETED)
+
+        for future in pending:
+            future.cancel()
+        return [domain for domain, future in zip(domains, futures)
+                if future.done() and not future.cancelled() and future.exception() is None and future.result()]
+
+    def probe(self, url, company_name, cancelled):
+        """HEAD-probe a candidate and verify its content, unless a better one already won"""
+        if cancelled.is_set():
+            return False
+        try:
+            status_code = self.head(url, timeout=self.probe_timeout, allow_redirects=True)
+            if status_code != 200 or cancelled.is_set():
+                return False
+            return self.verify(url, company_name)
+        except Exception:
+            return False
+
+    def resolve(self, clean_name, original_name, domains=None):
+        """Return the highest-priority candidate that verifies, or None
+
+        `domains` are precomputed candidates (see CompanyIndex); they are built
+        from the names when not given.
+        """
+        if domains is None:
+            domains = self.candidate_domains(clean_name, original_name)
+        domains = self.filter_resolvable(domains)
+        if not domains:
+            return None
+
+        cancelled = threading.Event()
+        futures = [self.executor.submit(self.probe, f"https://{domain}", original_name, cancelled)
+                   for domain in domains]
+        try:
+            # Walk in priority order: when candidate i verifies, all earlier ones have
+            # already failed, so i wins and everything after it can be abandoned
+            for domain, future in zip(domains, futures):
+                if future.result():
+                    logger.info(f"Found direct domain: {domain}")
+                    return f"https://{domain}"
+            return None
+        finally:
+            cancelled.set()
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,202 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from sqlite_store import SqliteStore
+
+logger = logging.getLogger(__name__)
+
+# The stored body is already decoded, so these no longer describe it
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+
+class HttpCacheStore(SqliteStore):
+    """SQLite store of GET response bodies and their validators"""
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS responses (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            fresh_until REAL NOT NULL,
+            headers TEXT NOT NULL,
+            body BLOB NOT NULL,
+            stored_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path='http_cache.sqlite'):
+        super().__init__(path)
+
+    def get(self, url):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, fresh_until, headers, body FROM responses WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, fresh_until, headers, body = row
+        return {
+            'etag': etag,
+            'last_modified': last_modified,
+            'fresh_until': fresh_until,
+            'headers': json.loads(headers),
+            'body': zlib.decompress(body),
+        }
+
+    def put(self, url, etag, last_modified, fresh_until, headers, body):
+        try:
+            with self._lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (url, etag, last_modified, fresh_until, json.dumps(headers),
+                     zlib.compress(body), time.time())
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Error caching response for {url}: {e}")
+
+    def touch(self, url, fresh_until):
+        """Extend freshness after a successful revalidation"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE responses SET fresh_until = ?, stored_at = ? WHERE url = ?",
+                (fresh_until, time.time(), url)
+            )
+
+    def prune(self, max_age_days=30):
+        """Drop entries that haven't been stored or revalidated recently"""
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM responses WHERE stored_at < ?",
+                (time.time() - max_age_days * 86400,)
+            )
+        return cursor.rowcount
+
+
+def max_age(headers):
+    """Seconds a response may be reused without revalidation, from Cache-Control"""
+    cache_control = headers.get('Cache-Control', '').lower()
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return 0
+    match = re.search(r'max-age=(\d+)', cache_control)
+    return int(match.group(1)) if match else 0
+
+
+def storable(headers):
+    """Whether a response may be kept at all
+
+    Not for no-store or private responses, nor ones that vary on request headers:
+    only Accept-Encoding is ignored, as bodies are stored decoded.
+    """
+    cache_control = headers.get('Cache-Control', '').lower()
+    if re.search(r'\b(?:no-store|private)\b', cache_control):
+        return False
+    varies = {name.strip().lower() for name in headers.get('Vary', '').split(',') if name.strip()}
+    return not varies - {'accept-encoding'}
+
+
+class CachingAdapter(HTTPAdapter):
+    """Transport adapter that revalidates cached GETs with If-None-Match/If-Modified-Since
+
+    Responses served from the cache carry `not_modified = True`, so callers can skip
+    work whose input has not changed since the last run. Requests under a `route`d
+    URL prefix are sent by another adapter (e.g. transport.Http2Adapter) behind
+    the same cache.
+    """
+
+    def __init__(self, store, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.store = store
+        self.routes = {}
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0}
+        self._stats_lock = threading.Lock()
+
+    def route(self, prefix, adapter):
+        """Send requests for URLs starting with `prefix` through `adapter`, still cached here
+
+        Requests the adapter can't send (its `accepts(verify, cert)` is false) go over this one.
+        """
+        self.routes[prefix.lower()] = adapter
+
+    def _transmit(self, request, stream=False, **kwargs):
+        url = request.url.lower()
+        for prefix, adapter in self.routes.items():
+            if url.startswith(prefix) and adapter.accepts(kwargs.get('verify', True), kwargs.get('cert')):
+                return adapter.send(request, stream=stream, **kwargs)
+        return super().send(request, stream=stream, **kwargs)
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _cached_response(self, request, entry):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = entry['body']
+        # Lets streamed callers iterate the cached body like a downloaded one
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.not_modified = True
+        return response
+
+    def send(self, request, stream=False, **kwargs):
+        if request.method != 'GET':
+            return self._transmit(request, stream=stream, **kwargs)
+
+        entry = self.store.get(request.url)
+        if entry and entry['fresh_until'] > time.time():
+            self._count('hits')
+            return self._cached_response(request, entry)
+
+        if entry:
+            if entry['etag']:
+                request.headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                request.headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self._transmit(request, stream=stream, **kwargs)
+
+        if entry and response.status_code == 304:
+            self._count('revalidated')
+            self.store.touch(request.url, time.time() + max_age(response.headers))
+            response.close()
+            return self._cached_response(request, entry)
+
+        self._count('misses')
+        response.not_modified = False
+
+        # Streamed bodies are left alone so callers can stop reading early; they
+        # hand the body to `remember` if they read all of it
+        if not stream:
+            self.remember(response, response.content)
+        return response
+
+    def remember(self, response, body):
+        """Store a complete, storable 200 response body if it has validators or a max-age"""
+        if response.status_code != 200 or not storable(response.headers):
+            return
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        freshness = max_age(response.headers)
+        if etag or last_modified or freshness:
+            headers = {k: v for k, v in response.headers.items() if k.lower() not in DROPPED_HEADERS}
+            self.store.put(response.request.url, etag, last_modified, time.time() + freshness, headers, body)
+
+    def summary(self):
+        with self._stats_lock:
+            return dict(self.stats)
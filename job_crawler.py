@@ -1,34 +1,93 @@
-import requests
-import pandas as pd
-import json
-import time
-import random
+import argparse
+import html
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
-import re
 import os
 from datetime import datetime
 import logging
-from fake_useragent import UserAgent
+
+from async_engine import AsyncCrawlEngine
+from ats import AtsClient, detect_boards
+from career_discovery import MIN_SCORE, STRONG_SCORE, CareerPageCache, SitemapReader, score_career_url
+from change_detector import ChangeDetector, fingerprint
+from company_index import CompanyIndex, normalise_names
+from company_source import CompanySource
+from domain_resolver import DomainResolver
+from http_cache import CachingAdapter, HttpCacheStore
+from keyword_matcher import KeywordMatcher
+from metrics import Metrics, TimedParser, response_recorder
+from notifier import TelegramNotifier
+from website_cache import WebsiteCache
+from wikipedia import WikipediaCache, WikipediaResolver
+from page_parser import ParserPool, get_parser
+from page_store import Page, PageStore
+from politeness import HostScheduler, PoliteSession
+from recrawl_scheduler import RecrawlQueue
+from sharding import Shard, open_shard_state
+from state_store import StateStore
+from transport import Transport, UserAgents
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class JobCrawler:
-    def __init__(self):
-        self.ua = UserAgent()
-        self.session = requests.Session()
+    """Crawls the company list once
+
+    `run` shuts down the crawler's worker pools and connections when it ends, so
+    each instance runs a single time; create a new one for another run.
+    """
+
+    def __init__(self, shard=None, parse_workers=0, resolver=None):
+        # With a shard, only its companies are crawled and every state file gets a per-shard name
+        self.shard = shard
+        # Per-stage latencies, request counts and bytes, written as a report after each run
+        self.metrics = Metrics()
+        # Every session request waits on a per-host token bucket; search endpoints get
+        # conservative rates and failing hosts are cut off by a circuit breaker
+        self.scheduler = HostScheduler(host_rates={
+            'html.duckduckgo.com': 0.5,
+            'en.wikipedia.org': 2.0,
+            'www.wikidata.org': 2.0,
+        })
+        # Rotate user agents for better success rate: each host gets one from the bundled list
+        self.session = PoliteSession(self.scheduler, UserAgents())
+        self.session.hooks['response'].append(response_recorder(self.metrics))
         
-        # Rotate user agents for better success rate
         self.session.headers.update({
-            'User-Agent': self.ua.random,
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'en-GB,en;q=0.9',
             'Accept-Encoding': 'gzip, deflate',
             'Connection': 'keep-alive'
         })
         
+        # Revalidate previously fetched pages instead of downloading them again
+        http_cache_store = HttpCacheStore(self.state_path(os.getenv('HTTP_CACHE_FILE', 'http_cache.sqlite')))
+        http_cache_store.prune()
+        self.http_cache = CachingAdapter(http_cache_store)
+        
+        # Pool sizes, DNS cache, TLS session reuse and optional HTTP/2 hosts (HTTP_POOL_*, DNS_CACHE_SECONDS,
+        # HTTP2_HOSTS). CRAWLER_CONNECT_TO=host:port sends every connection to one address (e.g. bench/fake_web.py)
+        self.transport = Transport.from_env(resolver, self.metrics)
+        self.resolver = self.transport.resolver
+        self.transport.mount(self.session, self.http_cache)
+        
+        # lxml by default; HTML_PARSER=html.parser restores the BeautifulSoup path.
+        # With parse workers, parsing runs in separate processes so it scales with cores
+        if parse_workers > 0:
+            self.html_parser = ParserPool(os.getenv('HTML_PARSER'), parse_workers)
+        else:
+            self.html_parser = get_parser(os.getenv('HTML_PARSER'))
+        self.html_parser = TimedParser(self.html_parser, self.metrics)
+        
+        # Each URL is downloaded and parsed at most once per run
+        self.page_store = PageStore(int(os.getenv('PAGE_STORE_BYTES', 32 * 1024 * 1024)))
+        
+        # Bodies are read at most this far; multi-megabyte homepages hold nothing we need past it
+        self.max_page_bytes = int(os.getenv('FETCH_MAX_BYTES', 2 * 1024 * 1024))
+        
+        # Candidate domains are DNS-filtered and probed in parallel
+        self.domain_resolver = DomainResolver(self.head_status, self.verify_company_website, resolver=self.resolver)
+        
         # Job keywords to search for
         self.job_keywords = [
             'devops engineer',
@@ -39,159 +98,182 @@ class JobCrawler:
             'senior infrastructure engineer'
         ]
         
-        # Career page indicators
-        self.career_indicators = [
-            'careers', 'career', 'jobs', 'job', 'work-with-us', 'join-us',
-            'opportunities', 'employment', 'hiring', 'vacancies', 'positions'
-        ]
+        # Alternative phrasings reported as one of the keywords above
+        self.job_synonyms = {}
+        
+        # Compiled once; scales to hundreds of keywords without extra passes
+        self.keyword_matcher = KeywordMatcher(self.job_keywords, self.job_synonyms)
+        
+        # Vacancies hosted on Greenhouse/Lever/Workable/SmartRecruiters/Ashby are read from their JSON feeds
+        self.ats_client = AtsClient(self.session, os.getenv('ATS_FEED_BASE'))
         
         # Telegram configuration
         self.telegram_token = os.getenv('TELEGRAM_BOT_TOKEN')
         self.telegram_chat_id = os.getenv('TELEGRAM_CHAT_ID')
+        self.notifier = None
+        if self.telegram_token and self.telegram_chat_id:
+            # Alerts are batched and sent from a background thread, over the shared transport
+            # but not the polite session: the notifier does its own rate limiting
+            self.notifier = TelegramNotifier(
+                self.telegram_token, self.telegram_chat_id,
+                api_base=os.getenv('TELEGRAM_API_BASE', 'https://api.telegram.org'),
+                session=self.transport.session(),
+                metrics=self.metrics
+            )
         
         # Progress tracking files (NO GIT OPERATIONS)
         self.processed_file = 'processed_companies.json'
         self.failed_file = 'failed_companies.json'
         
-        self.load_processed_companies()
-        self.load_failed_companies()
+        # Normalised names and candidate domains, built once per company list
+        self.company_index = CompanyIndex(self.state_path(os.getenv('COMPANY_INDEX_FILE', 'company_index.sqlite')))
+        
+        # Career pages found per domain, from homepage links and sitemaps
+        self.career_cache = CareerPageCache(self.state_path(os.getenv('CAREER_CACHE_FILE', 'career_pages.sqlite')))
+        self.sitemap_reader = SitemapReader(self.session, max_bytes=self.max_page_bytes, metrics=self.metrics)
+        
+        # Wikipedia/Wikidata website candidates, prefetched for the whole run in bulk queries
+        self.wikipedia = WikipediaResolver(
+            self.session,
+            WikipediaCache(self.state_path(os.getenv('WIKIPEDIA_CACHE_FILE', 'wikipedia_cache.sqlite')))
+        )
+        
+        # Resolved websites survive between runs so repeat passes skip discovery
+        self.website_cache = WebsiteCache(self.state_path(os.getenv('WEBSITE_CACHE_FILE', 'website_cache.sqlite')))
+        
+        # Career-page fingerprints and already-alerted job titles for continuous monitoring
+        self.change_detector = ChangeDetector(self.state_path(os.getenv('FINGERPRINT_FILE', 'page_fingerprints.sqlite')))
+        
+        # Updates go to an append-only journal and are compacted into the JSON files
+        if shard is not None:
+            self.state = open_shard_state(shard, self.processed_file, self.failed_file)
+        else:
+            self.state = StateStore(self.processed_file, self.failed_file)
+        
+        # When each company is next due, from its outcomes, hit rate and failure backoff
+        self.recrawl = RecrawlQueue(
+            self.state_path(os.getenv('RECRAWL_QUEUE_FILE', 'recrawl_queue.sqlite')),
+            monitor_hours=float(os.getenv('RESCAN_HOURS', '24'))
+        )
+        if not len(self.recrawl):
+            self.seed_recrawl_queue()
+        
+        # Set once `run` has released the executors and connections above
+        self.closed = False
     
-    def load_processed_companies(self):
-        """Load the list of successfully processed companies"""
-        try:
-            if os.path.exists(self.processed_file):
-                with open(self.processed_file, 'r') as f:
-                    self.processed_companies = json.load(f)
-            else:
-                self.processed_companies = []
-            logger.info(f"Loaded {len(self.processed_companies)} processed companies")
-        except Exception as e:
-            logger.error(f"Error loading processed companies: {e}")
-            self.processed_companies = []
+    def state_path(self, path):
+        """Shard-specific name for a state file, so shards never write the same file"""
+        return self.shard.path(path) if self.shard is not None else path
     
-    def save_processed_companies(self):
-        """Save the list of processed companies (FILE ONLY)"""
-        try:
-            with open(self.processed_file, 'w') as f:
-                json.dump(self.processed_companies, f, indent=2)
-            logger.info(f"Saved {len(self.processed_companies)} processed companies")
-        except Exception as e:
-            logger.error(f"Error saving processed companies: {e}")
+    def seed_recrawl_queue(self):
+        """Import existing progress files into an empty recrawl queue"""
+        for company_name, entry in self.failed_companies.items():
+            self.recrawl.seed(company_name, entry.get('reason', 'error'), entry.get('count', 1))
+        for company_name in self.processed_companies:
+            self.recrawl.seed(company_name, 'no_change')
     
-    def load_failed_companies(self):
-        """Load the list of companies that failed processing"""
-        try:
-            if os.path.exists(self.failed_file):
-                with open(self.failed_file, 'r') as f:
-                    self.failed_companies = json.load(f)
-            else:
-                self.failed_companies = {}
-            logger.info(f"Loaded {len(self.failed_companies)} failed companies")
-        except Exception as e:
-            logger.error(f"Error loading failed companies: {e}")
-            self.failed_companies = {}
+    @property
+    def processed_companies(self):
+        """Companies processed successfully (ordered, O(1) membership)"""
+        return self.state.processed
     
-    def save_failed_companies(self):
-        """Save the list of failed companies (FILE ONLY)"""
-        try:
-            with open(self.failed_file, 'w') as f:
-                json.dump(self.failed_companies, f, indent=2)
-            logger.info(f"Saved {len(self.failed_companies)} failed companies")
-        except Exception as e:
-            logger.error(f"Error saving failed companies: {e}")
+    @property
+    def failed_companies(self):
+        """Failure records keyed by company name"""
+        return self.state.failed
+    
+    def save_progress(self):
+        """Flush progress to disk (FILE ONLY)"""
+        self.state.flush()
     
     def should_retry_company(self, company_name):
-        """Check if we should retry a previously failed company"""
-        if company_name not in self.failed_companies:
-            return True
-        
-        retry_count = self.failed_companies[company_name].get('count', 0)
-        # Retry up to 3 times, then skip
-        return retry_count < 3
+        """Check if a company is due another attempt (failures back off exponentially)"""
+        return self.recrawl.is_due(company_name)
+    
+    def record_failure(self, company_name, reason, error=None):
+        """Increment the failure count for a company and push back its next attempt"""
+        self.state.record_failure(company_name, reason, error)
+        self.recrawl.record(company_name, reason)
+        self.metrics.inc('crawler_outcomes_total', outcome=reason)
     
     def send_telegram_notification(self, message):
-        """Send notification via Telegram"""
-        if not self.telegram_token or not self.telegram_chat_id:
+        """Queue a notification for the background Telegram sender"""
+        if not self.notifier:
             logger.warning("Telegram credentials not configured")
             return
         
-        try:
-            url = f"https://api.telegram.org/bot{self.telegram_token}/sendMessage"
-            data = {
-                'chat_id': self.telegram_chat_id,
-                'text': message,
-                'parse_mode': 'HTML'
-            }
-            response = requests.post(url, data=data, timeout=10)
-            if response.status_code == 200:
-                logger.info("Telegram notification sent successfully")
-            else:
-                logger.error(f"Failed to send Telegram notification: {response.status_code}")
-        except Exception as e:
-            logger.error(f"Error sending Telegram notification: {e}")
+        self.notifier.notify(message)
+        self.metrics.inc('crawler_alerts_queued_total')
     
     def clean_company_name(self, company_name):
         """Clean company name for better domain matching"""
-        # Remove common suffixes
-        suffixes = ['ltd', 'limited', 'plc', 'inc', 'corp', 'corporation', 'group', 'holdings', 'uk', 'technology', 'tech', 'digital', 'systems']
-        clean = company_name.lower()
-        
-        for suffix in suffixes:
-            clean = re.sub(rf'\b{suffix}\b', '', clean)
-        
-        # Remove extra spaces and special characters
-        clean = re.sub(r'[^\w\s-]', '', clean).strip()
-        clean = re.sub(r'\s+', ' ', clean)
+        return normalise_names([company_name])[0].key
+    
+    def fetch_page(self, url, timeout=15):
+        """GET a URL at most once per run; repeat calls are served from the page store
+
+        The body is streamed: non-HTML content types are rejected from the headers,
+        and reading stops at `max_page_bytes` or after `timeout` seconds of reading.
+        """
+        def fetch(u):
+            response = self.session.get(u, timeout=timeout, stream=True)
+            return Page.from_response(response, self.html_parser, max_bytes=self.max_page_bytes,
+                                      read_timeout=timeout, on_finish=lambda page: self.page_read(page, response))
         
-        return clean
+        return self.page_store.get_or_fetch(url, fetch)
     
-    def try_direct_domains(self, clean_name, original_name):
+    def page_read(self, page, response):
+        """Account for a streamed page once reading stops, and cache it if it was read in full"""
+        if page.not_modified:
+            self.metrics.inc('crawler_pages_total', result='cached')
+            return
+        if page.rejected:
+            logger.info(f"Skipped {page.url}: content type {page.headers.get('Content-Type')}")
+            result = 'rejected'
+        elif page.truncated:
+            result = 'truncated'
+        else:
+            result = 'complete'
+            self.http_cache.remember(response, page.content)
+        self.metrics.inc('crawler_pages_total', result=result)
+        self.metrics.inc('crawler_bytes_downloaded_total', page.size)
+        self.metrics.observe('crawler_body_read_seconds', page.read_seconds)
+    
+    def head_status(self, url, timeout=10, allow_redirects=False):
+        """Status code for a HEAD probe, answered from an earlier GET when possible"""
+        page = self.page_store.get(url)
+        if page is not None:
+            return page.status_code
+        return self.session.head(url, timeout=timeout, allow_redirects=allow_redirects).status_code
+    
+    def try_direct_domains(self, clean_name, original_name, domains=None):
         """Try various domain patterns"""
-        # Generate multiple domain variations
-        variations = [
-            clean_name.replace(' ', ''),
-            clean_name.replace(' ', '-'),
-            original_name.lower().replace(' ', ''),
-            original_name.lower().replace(' ', '-'),
-            ''.join(word[0] for word in clean_name.split()),  # acronym
-        ]
-        
-        extensions = ['.com', '.co.uk', '.uk', '.org']
-        
-        for variation in variations:
-            if not variation:
-                continue
-                
-            for ext in extensions:
-                domain = f"{variation}{ext}"
-                try:
-                    response = self.session.head(f"https://{domain}", timeout=8, allow_redirects=True)
-                    if response.status_code == 200:
-                        # Verify it's actually the company by checking page content
-                        if self.verify_company_website(f"https://{domain}", original_name):
-                            logger.info(f"Found direct domain: {domain}")
-                            return f"https://{domain}"
-                except:
-                    continue
-        return None
+        return self.domain_resolver.resolve(clean_name, original_name, domains)
     
     def verify_company_website(self, url, company_name):
         """Verify if the website actually belongs to the company"""
         try:
-            response = self.session.get(url, timeout=10)
-            if response.status_code != 200:
+            page = self.fetch_page(url, timeout=10)
+            if page.status_code != 200:
                 return False
                 
-            soup = BeautifulSoup(response.content, 'html.parser')
-            page_text = soup.get_text().lower()
-            title = soup.find('title')
-            
             # Check if company name appears in title or page content
             company_words = company_name.lower().split()
-            matches = sum(1 for word in company_words if len(word) > 2 and word in page_text)
-            
-            # If at least half the company name words appear, consider it a match
-            return matches >= len(company_words) / 2
+            wanted = [word for word in company_words if len(word) > 2]
+            found = set()
+            
+            # If at least half the company name words appear, consider it a match.
+            # The text is scanned as it streams in, so reading stops once it's settled
+            def matched():
+                return sum(1 for word in wanted if word in found) >= len(company_words) / 2
+            
+            if matched():
+                return True
+            for text in page.iter_text():
+                found.update(word for word in wanted if word in text)
+                if matched():
+                    return True
+            return False
             
         except:
             return True  # If we can't verify, assume it's correct
@@ -202,17 +284,14 @@ class JobCrawler:
             query = f"{company_name} official website UK"
             search_url = f"https://html.duckduckgo.com/html/?q={query.replace(' ', '+')}"
             
-            response = self.session.get(search_url, timeout=15)
-            if response.status_code != 200:
+            page = self.fetch_page(search_url, timeout=15)
+            if page.status_code != 200:
                 return None
-                
-            soup = BeautifulSoup(response.content, 'html.parser')
             
             # Find search result links
-            result_links = soup.find_all('a', {'class': 'result__url'})
+            result_links = self.html_parser.links(page.content, css_class='result__url')
             
-            for link in result_links[:5]:  # Check top 5 results
-                href = link.get('href', '')
+            for href, _ in result_links[:5]:  # Check top 5 results
                 if href.startswith('http'):
                     # Clean the URL
                     clean_url = href.split('?')[0]  # Remove query parameters
@@ -235,56 +314,11 @@ class JobCrawler:
     def search_wikipedia(self, company_name):
         """Search Wikipedia for company official website"""
         try:
-            # Search Wikipedia
-            wiki_search_url = f"https://en.wikipedia.org/w/api.php"
-            params = {
-                'action': 'query',
-                'format': 'json',
-                'list': 'search',
-                'srsearch': f"{company_name} company UK",
-                'srlimit': 3
-            }
-            
-            response = self.session.get(wiki_search_url, params=params, timeout=10)
-            if response.status_code != 200:
-                return None
-                
-            data = response.json()
-            
-            # Check each search result
-            for result in data.get('query', {}).get('search', []):
-                page_title = result['title']
-                
-                # Get the Wikipedia page content
-                page_url = f"https://en.wikipedia.org/w/api.php"
-                page_params = {
-                    'action': 'query',
-                    'format': 'json',
-                    'prop': 'extracts|externallinks',
-                    'titles': page_title,
-                    'exintro': True,
-                    'explaintext': True,
-                    'elquery': '*',
-                    'ellimit': 10
-                }
-                
-                page_response = self.session.get(page_url, params=page_params, timeout=10)
-                if page_response.status_code == 200:
-                    page_data = page_response.json()
-                    pages = page_data.get('query', {}).get('pages', {})
-                    
-                    for page_id, page_info in pages.items():
-                        # Check external links for official website
-                        external_links = page_info.get('externallinks', [])
-                        
-                        for link in external_links:
-                            if any(domain in link for domain in ['.com', '.co.uk', '.uk']):
-                                # Skip social media
-                                if not any(social in link for social in ['facebook', 'twitter', 'linkedin']):
-                                    clean_link = link.split('?')[0]
-                                    if self.verify_company_website(clean_link, company_name):
-                                        logger.info(f"Found via Wikipedia: {clean_link}")
-                                        return clean_link
+            # Usually prefetched with the rest of the run; otherwise searched for now
+            for url in self.wikipedia.official_websites(company_name):
+                if self.verify_company_website(url, company_name):
+                    logger.info(f"Found via Wikipedia: {url}")
+                    return url
             
             return None
             
@@ -292,28 +326,67 @@ class JobCrawler:
             logger.error(f"Wikipedia search failed for {company_name}: {e}")
             return None
     
+    def indexed_company(self, company_name):
+        """(search name, key, candidate domains or None), normalised on the fly if not indexed"""
+        indexed = self.company_index.get(company_name)
+        if indexed is None:
+            company = normalise_names([company_name])[0]
+            indexed = company.search_name, company.key, None
+        return indexed
+    
+    def prefetch_wikipedia(self, companies):
+        """Look up the Wikipedia articles of planned companies that have no cached website yet"""
+        try:
+            search_names = []
+            for company_name in companies:
+                if self.website_cache.get(company_name):
+                    continue
+                search_name, clean_name, _ = self.indexed_company(company_name)
+                if clean_name:
+                    search_names.append(search_name)
+            self.wikipedia.prefetch(search_names)
+        except Exception as e:
+            logger.error(f"Wikipedia prefetch failed: {e}")
+    
     def get_company_website(self, company_name):
         """Search for company's official website using multiple strategies"""
         try:
-            # Clean company name for better matching
-            clean_name = self.clean_company_name(company_name)
-            
-            # Strategy 1: Try direct domain patterns
-            website = self.try_direct_domains(clean_name, company_name)
-            if website:
-                return website
-            
-            # Strategy 2: Search using DuckDuckGo
-            website = self.search_duckduckgo(company_name)
-            if website:
-                return website
-            
-            # Strategy 3: Try Wikipedia search (often has official links)
-            website = self.search_wikipedia(company_name)
-            if website:
-                return website
+            # Reuse an earlier resolution (or an earlier miss) while it is still fresh
+            cached = self.website_cache.get(company_name)
+            if cached:
+                logger.info(f"Website cache hit for {company_name}: {cached['url']} ({cached['strategy']})")
+                self.metrics.inc('crawler_website_strategy_total', strategy='cache')
+                return cached['url']
+            
+            # Clean company name for better matching (precomputed for indexed companies)
+            with self.metrics.timer('clean_company_name'):
+                search_name, clean_name, domains = self.indexed_company(company_name)
+            
+            if not clean_name:
+                logger.warning(f"Nothing left of {company_name!r} to search for")
+                self.metrics.inc('crawler_website_strategy_total', strategy='none')
+                return None
+            
+            strategies = [
+                # Strategy 1: Try direct domain patterns
+                ('direct', lambda: self.try_direct_domains(clean_name, search_name, domains)),
+                # Strategy 2: Search using DuckDuckGo
+                ('duckduckgo', lambda: self.search_duckduckgo(search_name)),
+                # Strategy 3: Try Wikipedia search (often has official links)
+                ('wikipedia', lambda: self.search_wikipedia(search_name)),
+            ]
+            
+            for strategy, search in strategies:
+                with self.metrics.timer(f'website_{strategy}'):
+                    website = search()
+                if website:
+                    self.metrics.inc('crawler_website_strategy_total', strategy=strategy)
+                    self.website_cache.put(company_name, website, strategy)
+                    return website
                 
             logger.warning(f"Could not find website for {company_name} using any method")
+            self.metrics.inc('crawler_website_strategy_total', strategy='none')
+            self.website_cache.put(company_name, None, 'no_website')
             return None
             
         except Exception as e:
@@ -321,117 +394,190 @@ class JobCrawler:
             return None
     
     def find_career_pages(self, base_url):
-        """Find career pages on the website"""
-        career_urls = []
+        """Find career pages on the website, best first, or None if the website itself didn't load"""
+        candidates = {}
+        source = 'none'
         
         try:
-            response = self.session.get(base_url, timeout=15)
-            if response.status_code != 200:
-                return career_urls
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for career links
-            links = soup.find_all('a', href=True)
+            # Fetched even when the career pages are cached: a dead website must still be noticed,
+            # and ATS boards embedded on the homepage are detected from the stored page
+            page = self.fetch_page(base_url, timeout=15)
+            if page.status_code != 200:
+                logger.warning(f"Homepage {base_url} returned {page.status_code}")
+                return None
+        
+            cached = self.career_cache.get(base_url)
+            if cached is not None:
+                self.metrics.inc('crawler_career_discovery_total', source='cache')
+                return cached
+        
+            # Strategy 1: Homepage links, scored on whole words of their URL and anchor text
+            for link_href, link_text in page.links:
+                full_url = urljoin(page.url, link_href)
+                score = score_career_url(full_url, link_text)
+                if score >= MIN_SCORE:
+                    candidates[full_url] = max(score, candidates.get(full_url, score))
+            if candidates:
+                source = 'links'
+            
+            # Strategy 2: Sitemaps from robots.txt, unless the homepage already links a careers page
+            found_sitemap = False
+            if max(candidates.values(), default=0) < STRONG_SCORE:
+                sitemap_candidates, found_sitemap = self.sitemap_reader.candidates(page.url)
+                for url, score in sitemap_candidates.items():
+                    candidates[url] = max(score, candidates.get(url, score))
+                if sitemap_candidates:
+                    source = 'sitemap'
+            
+            # Strategy 3: Only sites without a sitemap get the common paths probed
+            if not candidates and not found_sitemap:
+                for path in ['/careers', '/career', '/jobs', '/job-opportunities']:
+                    career_url = urljoin(page.url, path)
+                    try:
+                        if self.head_status(career_url, timeout=10) == 200:
+                            candidates[career_url] = score_career_url(career_url)
+                            source = 'probe'
+                    except Exception:
+                        continue
             
-            for link in links:
-                href = link.get('href', '').lower()
-                text = link.get_text().lower()
-                
-                # Check if link or text contains career indicators
-                for indicator in self.career_indicators:
-                    if indicator in href or indicator in text:
-                        full_url = urljoin(base_url, link.get('href'))
-                        if full_url not in career_urls:
-                            career_urls.append(full_url)
-                        break
-            
-            # Also check common career page URLs
-            common_paths = ['/careers', '/career', '/jobs', '/job-opportunities']
-            for path in common_paths:
-                career_url = urljoin(base_url, path)
-                try:
-                    response = self.session.head(career_url, timeout=10)
-                    if response.status_code == 200 and career_url not in career_urls:
-                        career_urls.append(career_url)
-                except:
-                    continue
-                    
         except Exception as e:
             logger.error(f"Error finding career pages for {base_url}: {e}")
+            return None
         
-        return career_urls[:3]  # Limit to 3 career pages per company
+        # Limit to 3 career pages per company
+        career_urls = sorted(candidates, key=candidates.get, reverse=True)[:3]
+        # Links from a cut-off homepage are incomplete, so they aren't kept for the next runs
+        if not page.truncated:
+            self.career_cache.put(base_url, career_urls, source)
+        self.metrics.inc('crawler_career_discovery_total', source=source)
+        return career_urls
     
     def check_job_openings(self, career_url):
-        """Check if there are relevant job openings on the career page"""
+        """Check a career page for relevant openings, returning {job title: keywords}"""
         try:
-            response = self.session.get(career_url, timeout=15)
-            if response.status_code != 200:
-                return []
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            page_text = soup.get_text().lower()
-            
-            found_jobs = []
-            
-            for keyword in self.job_keywords:
-                if keyword in page_text:
-                    # Try to find the specific job posting
-                    job_elements = soup.find_all(['div', 'li', 'h3', 'h4', 'p'], 
-                                               string=re.compile(keyword, re.IGNORECASE))
-                    
-                    if job_elements:
-                        found_jobs.append(keyword)
-            
+            page = self.fetch_page(career_url, timeout=15)
+            if page.status_code != 200 or page.rejected:
+                return {}
+            
+            # Page is unchanged since the last run and was scanned for the current keywords,
+            # so it can't hold new openings
+            matcher = self.keyword_matcher.signature
+            if page.not_modified and self.change_detector.scanned_with(career_url, matcher):
+                logger.info(f"Career page not modified, skipping scan: {career_url}")
+                return {}
+            
+            # Servers without validators: compare a hash of the visible text (and the keywords) instead
+            page_fingerprint = fingerprint(page.text, matcher)
+            if not self.change_detector.page_changed(career_url, page_fingerprint):
+                logger.info(f"Career page content unchanged, skipping scan: {career_url}")
+                return {}
+            
+            # No keyword anywhere in the text: skip building the document tree
+            if not self.keyword_matcher.search(page.text):
+                self.change_detector.record_page(career_url, page_fingerprint, matcher)
+                return {}
+            
+            # One walk over the candidate elements finds every keyword at once; the
+            # matching element's text is the closest thing to a job title we have
+            found_jobs = self.keyword_matcher.scan_texts(page.element_strings(['div', 'li', 'h3', 'h4', 'p']))
+            
+            self.change_detector.record_page(career_url, page_fingerprint, matcher)
             return found_jobs
             
         except Exception as e:
             logger.error(f"Error checking job openings for {career_url}: {e}")
-            return []
+            return {}
+    
+    def find_ats_boards(self, urls):
+        """Detect ATS job boards in the given URLs and in any of them already fetched this run"""
+        boards = []
+        for url in urls:
+            found = detect_boards(url)
+            page = self.page_store.get(url)
+            if page is not None and page.status_code == 200:
+                found += detect_boards(page.content.decode('utf-8', errors='ignore'))
+            for board in found:
+                if board not in boards:
+                    boards.append(board)
+        return boards
+    
+    def check_ats_jobs(self, boards):
+        """Match job titles from ATS JSON feeds against the job keywords"""
+        postings = []
+        for provider, token in boards:
+            for job in self.ats_client.fetch_jobs(provider, token):
+                keywords = self.keyword_matcher.ordered(self.keyword_matcher.search(job['title']))
+                if keywords:
+                    postings.append(dict(job, provider=provider, keywords=keywords))
+        return postings
     
     def process_company(self, company_name):
         """Process a single company"""
+        with self.metrics.timer('process_company'):
+            return self._process_company(company_name)
+    
+    def _process_company(self, company_name):
         logger.info(f"Processing company: {company_name}")
         
-        # Skip if already processed successfully
-        if company_name in self.processed_companies:
-            logger.info(f"Skipping {company_name} - already processed successfully")
-            return None
-            
-        # Skip if failed too many times
+        # Skip until the recrawl schedule says the company is due again
         if not self.should_retry_company(company_name):
-            logger.info(f"Skipping {company_name} - failed too many times")
+            logger.info(f"Skipping {company_name} - not due for another visit yet")
             return None
         
+        was_processed = company_name in self.processed_companies
+        
         try:
             # Get company website
-            website = self.get_company_website(company_name)
+            with self.metrics.timer('get_company_website'):
+                website = self.get_company_website(company_name)
             if not website:
                 logger.warning(f"Could not find website for {company_name}")
                 # Mark as failed
-                if company_name not in self.failed_companies:
-                    self.failed_companies[company_name] = {'count': 0, 'reason': 'no_website'}
-                self.failed_companies[company_name]['count'] += 1
+                self.record_failure(company_name, 'no_website')
                 return None
             
             logger.info(f"Found website for {company_name}: {website}")
             
             # Find career pages
-            career_pages = self.find_career_pages(website)
-            if not career_pages:
+            with self.metrics.timer('find_career_pages'):
+                career_pages = self.find_career_pages(website)
+            if career_pages is None:
+                # A cached website may have gone away since it was resolved: find it again next time
+                self.website_cache.invalidate(company_name)
+                self.record_failure(company_name, 'error', f"Website {website} did not load")
+                return None
+            
+            # ATS boards linked or embedded on the homepage
+            with self.metrics.timer('find_ats_boards'):
+                ats_boards = self.find_ats_boards([website] + career_pages)
+            
+            if not career_pages and not ats_boards:
                 logger.warning(f"No career pages found for {company_name}")
                 # Mark as failed
-                if company_name not in self.failed_companies:
-                    self.failed_companies[company_name] = {'count': 0, 'reason': 'no_career_pages'}
-                self.failed_companies[company_name]['count'] += 1
+                self.record_failure(company_name, 'no_career_pages')
                 return None
             
-            # Check for job openings
-            all_found_jobs = []
+            # Check for job openings: {job title: keywords}
+            found_titles = {}
             for career_url in career_pages:
-                found_jobs = self.check_job_openings(career_url)
-                if found_jobs:
-                    all_found_jobs.extend(found_jobs)
+                # ATS boards are usually JS shells; their JSON feed is read below instead
+                if detect_boards(career_url):
+                    continue
+                with self.metrics.timer('check_job_openings'):
+                    found_titles.update(self.check_job_openings(career_url))
+                for board in self.find_ats_boards([career_url]):
+                    if board not in ats_boards:
+                        ats_boards.append(board)
+            
+            with self.metrics.timer('check_ats_jobs'):
+                ats_postings = self.check_ats_jobs(ats_boards)
+            for posting in ats_postings:
+                found_titles[posting['title']] = posting['keywords']
+            
+            # Only openings we haven't alerted on before are worth a notification
+            new_titles = self.change_detector.new_titles(company_name, found_titles)
+            ats_postings = [p for p in ats_postings if p['title'] in new_titles]
+            all_found_jobs = [keyword for title in new_titles for keyword in found_titles[title]]
             
             if all_found_jobs:
                 result = {
@@ -439,21 +585,31 @@ class JobCrawler:
                     'website': website,
                     'career_pages': career_pages,
                     'found_jobs': list(set(all_found_jobs)),
+                    'new_titles': new_titles,
+                    'postings': ats_postings,
                     'timestamp': datetime.now().isoformat()
                 }
                 
-                # Send Telegram notification
+                # Structured postings read from ATS feeds, if any
+                postings_block = ''
+                if ats_postings:
+                    postings_block = "\n<b>Postings:</b>\n" + "\n".join(
+                        f"• {html.escape(p['title'])}" + (f" ({html.escape(p['location'])})" if p['location'] else '')
+                        for p in ats_postings[:5]
+                    ) + "\n"
+                
+                # Send Telegram notification; it is parsed as HTML, so every interpolated field is escaped
                 message = f"""
 🎉 <b>Job Alert!</b>
 
-<b>Company:</b> {company_name}
-<b>Website:</b> {website}
+<b>Company:</b> {html.escape(company_name)}
+<b>Website:</b> {html.escape(website)}
 <b>Found Positions:</b>
-{chr(10).join([f"• {job.title()}" for job in result['found_jobs']])}
+{chr(10).join([f"• {html.escape(job.title())}" for job in result['found_jobs']])}
 
 <b>Career Pages:</b>
-{chr(10).join([f"• {url}" for url in career_pages[:2]])}
-
+{chr(10).join([f"• {html.escape(url)}" for url in (career_pages or [p['url'] for p in ats_postings])[:2]])}
+{postings_block}
 <b>Time:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                 """
                 
@@ -461,93 +617,185 @@ class JobCrawler:
                 logger.info(f"Found job openings at {company_name}: {all_found_jobs}")
                 
                 # Mark as successfully processed
-                self.processed_companies.append(company_name)
+                self.state.mark_processed(company_name)
+                self.recrawl.record(company_name, 'hit')
+                self.metrics.inc('crawler_outcomes_total', outcome='hit')
                 return result
+            elif found_titles or was_processed:
+                # Still hiring (or pages unchanged) but nothing we haven't already reported
+                logger.info(f"No new job openings at {company_name}")
+                self.state.mark_processed(company_name)
+                self.recrawl.record(company_name, 'no_change')
+                self.metrics.inc('crawler_outcomes_total', outcome='no_change')
+                return None
             else:
                 logger.info(f"No relevant job openings found at {company_name}")
                 # Mark as failed (no jobs found)
-                if company_name not in self.failed_companies:
-                    self.failed_companies[company_name] = {'count': 0, 'reason': 'no_jobs'}
-                self.failed_companies[company_name]['count'] += 1
+                self.record_failure(company_name, 'no_jobs')
                 return None
                 
         except Exception as e:
             logger.error(f"Error processing {company_name}: {e}")
             # Mark as failed
-            if company_name not in self.failed_companies:
-                self.failed_companies[company_name] = {'count': 0, 'reason': 'error'}
-            self.failed_companies[company_name]['count'] += 1
-            self.failed_companies[company_name]['last_error'] = str(e)
+            self.record_failure(company_name, 'error', e)
             return None
     
-    def run(self, excel_file, max_companies=10):
+    def crawl_sequentially(self, companies_to_process):
+        """Process companies one at a time"""
+        results = []
+        
+        for i, company in enumerate(companies_to_process):
+            logger.info(f"Processing {i+1}/{len(companies_to_process)}: {company}")
+            
+            result = self.process_company(company)
+            if result:
+                results.append(result)
+            
+            # Save progress after each company (FILES ONLY - NO GIT)
+            self.save_progress()
+        
+        return results
+    
+    def crawl_concurrently(self, companies_to_process, concurrency):
+        """Process companies on a bounded worker pool; the host scheduler keeps it polite"""
+        logger.info(f"Crawling with {concurrency} concurrent workers")
+        return AsyncCrawlEngine(self, concurrency).run(companies_to_process)
+    
+    def run(self, excel_file, max_companies=10, concurrency=1):
         """Main execution function - NO GIT OPERATIONS"""
+        if self.closed:
+            raise RuntimeError("JobCrawler.run can only be called once per instance")
         logger.info(f"Starting job crawler - processing up to {max_companies} companies")
         
         try:
-            # Read Excel file
-            df = pd.read_excel(excel_file)
-            
-            # Assume company names are in the first column
-            company_column = df.columns[0]
-            companies = df[company_column].dropna().tolist()
-            
-            # Filter out already processed companies
-            unprocessed_companies = [c for c in companies if c not in self.processed_companies]
-            
-            if not unprocessed_companies:
-                logger.info("All companies have been processed. Resetting processed list.")
-                self.processed_companies = []
-                unprocessed_companies = companies
+            # Stream company names from where the last run stopped
+            source = CompanySource(excel_file, self.state_path(os.getenv('COMPANY_CURSOR_FILE', 'company_cursor.json')))
+            
+            # One batch pass over the list (skipped when it hasn't changed) instead of per-company cleaning
+            self.company_index.build(source, self.domain_resolver.candidate_domains, self.domain_resolver.extensions)
+            
+            def skip(company_name):
+                if self.shard is not None and not self.shard.owns(company_name):
+                    return True
+                # Same company under another spelling, or a name like "@@@"
+                if self.company_index.skip(company_name):
+                    return True
+                return company_name in self.recrawl
+            
+            # Most overdue known companies first, with part of the budget kept for unseen ones
+            companies_to_process = self.recrawl.plan(
+                max_companies,
+                lambda n: source.take(n, skip=skip)
+            )
+            
+            # Titles of every company that may reach the Wikipedia strategy, in a few bulk queries
+            with self.metrics.timer('wikipedia_prefetch'):
+                self.prefetch_wikipedia(companies_to_process)
+            
+            if concurrency > 1:
+                results = self.crawl_concurrently(companies_to_process, concurrency)
+            else:
+                results = self.crawl_sequentially(companies_to_process)
             
-            # Process companies (up to max_companies)
-            companies_to_process = unprocessed_companies[:max_companies]
-            results = []
-            
-            for i, company in enumerate(companies_to_process):
-                logger.info(f"Processing {i+1}/{len(companies_to_process)}: {company}")
-                
-                result = self.process_company(company)
-                if result:
-                    results.append(result)
-                
-                # Save progress after each company (FILES ONLY - NO GIT)
-                self.save_processed_companies()
-                self.save_failed_companies()
-                
-                # Add shorter delay between requests to be respectful but efficient
-                time.sleep(random.uniform(1, 3))
+            # Only move the cursor once the batch has actually been crawled
+            source.save_cursor()
             
             logger.info(f"Completed processing. Found jobs at {len(results)} companies.")
             
             # Send summary notification
             if results:
+                shard_label = f" (shard {self.shard})" if self.shard is not None else ""
                 summary = f"""
-📊 <b>Crawling Summary</b>
+📊 <b>Crawling Summary</b>{shard_label}
 
 <b>Companies Processed:</b> {len(companies_to_process)}
 <b>Jobs Found:</b> {len(results)}
 
 <b>Companies with Openings:</b>
-{chr(10).join([f"• {r['company']}" for r in results])}
+{chr(10).join([f"• {html.escape(r['company'])}" for r in results])}
                 """
                 self.send_telegram_notification(summary.strip())
             
+            # Fold this run's journal into the JSON progress files
+            self.state.compact()
+            
             # Print final statistics
             print(f"=== FINAL STATISTICS ===")
             print(f"Total processed companies: {len(self.processed_companies)}")
             print(f"Total failed companies: {len(self.failed_companies)}")
             print(f"Jobs found in this run: {len(results)}")
-            
+            cache_stats = self.http_cache.summary()
+            scheduler_stats = self.scheduler.summary()
+            print(f"Host scheduler: {scheduler_stats['requests']} requests to {scheduler_stats['hosts']} hosts, "
+                  f"{scheduler_stats['throttled']} throttled, {scheduler_stats['circuits_opened']} circuits opened, "
+                  f"{scheduler_stats['waited_seconds']:.1f}s waiting")
+            print(f"HTTP cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                  f"{cache_stats['revalidated']} revalidated")
+            wiki_stats = self.wikipedia.stats
+            print(f"Wikipedia: {wiki_stats['prefetched']} companies prefetched, {wiki_stats['resolved']} looked up "
+                  f"one by one, {wiki_stats['cached']} from cache ({wiki_stats['requests']} API requests)")
+            
+            self.metrics.set_gauge('crawler_companies_planned', len(companies_to_process))
+            self.metrics.set_gauge('crawler_companies_with_jobs', len(results))
             return results
             
         except Exception as e:
             logger.error(f"Error in main execution: {e}")
-            self.send_telegram_notification(f"❌ Job crawler encountered an error: {str(e)}")
+            self.send_telegram_notification(f"❌ Job crawler encountered an error: {html.escape(str(e))}")
             return []
+        
+        finally:
+            self.closed = True
+            # Deliver everything still queued before the process exits
+            if self.notifier:
+                self.notifier.close()
+            # Stops the parse worker processes, if any
+            self.html_parser.close()
+            self.wikipedia.close()
+            # Half-read pages give back their connections and count their bytes before the report
+            self.page_store.clear()
+            self.transport.close()
+            # Nothing writes to the SQLite stores any more
+            for store in (self.http_cache.store, self.company_index, self.career_cache, self.wikipedia.cache,
+                          self.website_cache, self.change_detector, self.recrawl):
+                store.close()
+            # Last, so Telegram sends flushed above are included
+            self.write_run_report()
+    
+    def write_run_report(self):
+        """Write the run's metrics as JSON and a Prometheus textfile, and print the slowest stages"""
+        for name, stats in (('scheduler', self.scheduler.summary()), ('http_cache', self.http_cache.summary()),
+                            ('page_store', self.page_store.stats), ('transport', self.transport.summary()),
+                            ('wikipedia', self.wikipedia.stats)):
+            for key, value in stats.items():
+                self.metrics.set_gauge(f'crawler_{name}_{key}', value)
+        
+        report = self.metrics.report(
+            self.state_path(os.getenv('METRICS_FILE', 'crawl_metrics.json')),
+            self.state_path(os.getenv('METRICS_PROM_FILE', 'crawl_metrics.prom'))
+        )
+        
+        stages = [h for h in report['histograms'] if h['name'] == 'crawler_stage_seconds']
+        print(f"=== STAGE TIMINGS ({report['duration_seconds']:.1f}s run) ===")
+        for h in sorted(stages, key=lambda h: h['sum'], reverse=True):
+            print(f"{h['labels']['stage']:<22} {h['count']:>6} calls  {h['sum']:>8.2f}s total  "
+                  f"mean {h['mean']:.3f}s  p95 <= {h['p95']:.3f}s")
+        parse = sum(h['sum'] for h in report['histograms'] if h['name'] == 'crawler_parse_seconds')
+        network = sum(h['sum'] for h in report['histograms'] if h['name'] == 'crawler_network_seconds')
+        print(f"Parsing: {parse:.2f}s, network: {network:.2f}s")
+        transport = self.transport.summary()
+        print(f"Connections: {transport['connections']} opened, {transport['setup_seconds']:.2f}s setting up, "
+              f"{transport['tls_resumed']}/{transport['tls_handshakes']} TLS sessions resumed, "
+              f"{transport['dns_cache_hits']} DNS cache hits")
 
 if __name__ == "__main__":
-    crawler = JobCrawler()
+    arg_parser = argparse.ArgumentParser(description="Crawl company career pages for matching jobs")
+    arg_parser.add_argument('--shard', type=Shard.parse, help="Only crawl shard i of N, e.g. 2/4 (merge with sharding.py)")
+    arg_parser.add_argument('--parse-workers', type=int, default=int(os.getenv('PARSE_WORKERS', '0')),
+                            help="Parse HTML in this many worker processes (default: in-process)")
+    args = arg_parser.parse_args()
+    
+    crawler = JobCrawler(shard=args.shard, parse_workers=args.parse_workers)
     
     # Get Excel file path from environment variable or use default
     excel_file = os.getenv('EXCEL_FILE', 'companies.xlsx')
@@ -556,7 +804,10 @@ if __name__ == "__main__":
         logger.error(f"Excel file not found: {excel_file}")
         exit(1)
     
+    # Number of companies crawled at once (1 keeps the original sequential behaviour)
+    concurrency = int(os.getenv('CRAWLER_CONCURRENCY', '1'))
+    
     # Run crawler (NO GIT OPERATIONS ANYWHERE)
-    results = crawler.run(excel_file, max_companies=10)
+    results = crawler.run(excel_file, max_companies=10, concurrency=concurrency)
     
     print(f"Crawling completed. Found jobs at {len(results)} companies.")
@@ -0,0 +1,86 @@
+import hashlib
+import re
+
+
+def trie_pattern(phrases):
+    """Build a prefix-factored regex alternation for `phrases`
+
+    Shared prefixes are matched once, so adding keywords grows the pattern
+    rather than the number of alternatives tried at each position.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        ends_here = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Greedy optional prefers the longer phrase when a shorter one also ends here
+        if ends_here:
+            return '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Finds many keywords (and their synonyms) in a single pass over the text"""
+
+    def __init__(self, keywords, synonyms=None):
+        self.keywords = [keyword.lower() for keyword in keywords]
+
+        # Every phrase we look for maps back to the keyword it reports
+        self.canonical = {keyword: keyword for keyword in self.keywords}
+        for phrase, keyword in (synonyms or {}).items():
+            self.canonical[phrase.lower()] = keyword.lower()
+
+        phrases = sorted(self.canonical)
+        # Identifies this phrase set, so pages scanned for other keywords are scanned again
+        digest = hashlib.blake2b('\n'.join(f"{phrase}={self.canonical[phrase]}" for phrase in phrases).encode('utf-8'),
+                                 digest_size=8).digest()
+        self.signature = int.from_bytes(digest, 'big', signed=True)
+        # Lookahead lets matches overlap, so "devops engineer" is still seen inside
+        # "senior devops engineer" one position later
+        self.pattern = re.compile('(?=(' + trie_pattern(phrases) + '))')
+
+        # Only the longest phrase is reported at a given start position; any other
+        # phrase contained in it is implied by that match
+        self.implied = {
+            phrase: {other for other in phrases if other != phrase and other in phrase}
+            for phrase in phrases
+        }
+
+    def search(self, text):
+        """Return the set of keywords occurring anywhere in `text`"""
+        found = set()
+        for match in self.pattern.finditer(text.lower()):
+            phrase = match.group(1)
+            if not phrase:
+                continue
+            found.add(self.canonical[phrase])
+            for other in self.implied[phrase]:
+                found.add(self.canonical[other])
+        return found
+
+    def ordered(self, found):
+        """Return keywords from `found` in their configured order"""
+        return [keyword for keyword in dict.fromkeys(self.keywords) if keyword in found]
+
+    def scan_texts(self, element_strings):
+        """Map each matching element's text (whitespace-normalised) to its keywords
+
+        `element_strings` yields (element, text) pairs from a single walk of the
+        tree (see Page.element_strings), so every keyword is checked in one pass.
+        """
+        matches = {}
+        for _, text in element_strings:
+            found = self.search(text)
+            if found:
+                matches[' '.join(text.split())] = self.ordered(found)
+        return matches
@@ -0,0 +1,285 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus style
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with sum, count and max"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': round(self.max, 6),
+        }
+
+
+class Metrics:
+    """Thread-safe counters, gauges and latency histograms for one crawl run
+
+    Each series is a metric name plus labels. `report` writes them as JSON and as
+    a Prometheus textfile (for node_exporter's textfile collector).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.started = time.time()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """Time the enclosed block as one observation of crawler_stage_seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('crawler_stage_seconds', time.perf_counter() - start, stage=stage, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'started': self.started,
+                'duration_seconds': round(time.time() - self.started, 3),
+                'counters': [dict(name=name, labels=dict(labels), value=value)
+                             for (name, labels), value in sorted(self.counters.items())],
+                'gauges': [dict(name=name, labels=dict(labels), value=value)
+                           for (name, labels), value in sorted(self.gauges.items())],
+                'histograms': [dict(name=name, labels=dict(labels), **histogram.to_dict())
+                               for (name, labels), histogram in sorted(self.histograms.items())],
+            }
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            for kind, series in (('counter', self.counters), ('gauge', self.gauges)):
+                typed = set()
+                for (name, labels), value in sorted(series.items()):
+                    if name not in typed:
+                        lines.append(f"# TYPE {name} {kind}")
+                        typed.add(name)
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+
+            typed = set()
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def report(self, json_file, prometheus_file=None, regression_ratio=1.5):
+        """Write the run report and log stages that got slower than in the previous report"""
+        snapshot = self.snapshot()
+        previous = _read_report(json_file)
+        if previous:
+            for stage, before, after in compare_stages(previous, snapshot, regression_ratio):
+                logger.warning(f"Stage {stage} slowed down: mean {before:.3f}s -> {after:.3f}s")
+        try:
+            _write_atomic(json_file, json.dumps(snapshot, indent=2))
+            if prometheus_file:
+                _write_atomic(prometheus_file, self.to_prometheus())
+            logger.info(f"Wrote run metrics to {json_file}")
+        except Exception as e:
+            logger.error(f"Error writing run metrics: {e}")
+        return snapshot
+
+
+def compare_stages(previous, current, ratio=1.5, min_count=5):
+    """(stage, previous mean, current mean) for stages at least `ratio` times slower"""
+    def stage_means(report):
+        return {
+            h['labels'].get('stage'): (h['mean'], h['count'])
+            for h in report.get('histograms', [])
+            if h['name'] == 'crawler_stage_seconds' and len(h['labels']) == 1
+        }
+
+    before = stage_means(previous)
+    slower = []
+    for stage, (mean, count) in stage_means(current).items():
+        if stage not in before or count < min_count or before[stage][1] < min_count:
+            continue
+        if before[stage][0] > 0 and mean >= before[stage][0] * ratio:
+            slower.append((stage, before[stage][0], mean))
+    return slower
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _read_report(path):
+    try:
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable metrics report {path}: {e}")
+    return None
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class TimedParser:
+    """Wraps a parser backend so time spent parsing is recorded separately from network time"""
+
+    def __init__(self, parser, metrics):
+        self.parser = parser
+        self.metrics = metrics
+        self.name = parser.name
+
+    def _timed(self, op, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.metrics.observe('crawler_parse_seconds', time.perf_counter() - start, op=op)
+
+    def parse(self, content):
+        return self._timed('parse', self.parser.parse, content)
+
+    def visible_text(self, content):
+        return self._timed('visible_text', self.parser.visible_text, content)
+
+    def links(self, content, css_class=None):
+        return self._timed('links', lambda c: list(self.parser.links(c, css_class)), content)
+
+    def iter_visible_text(self, chunks):
+        # Chunks may come straight off the network: count only the parser's own time
+        waited = 0.0
+
+        def read():
+            nonlocal waited
+            iterator = iter(chunks)
+            while True:
+                start = time.perf_counter()
+                chunk = next(iterator, None)
+                waited += time.perf_counter() - start
+                if chunk is None:
+                    return
+                yield chunk
+
+        pieces = self.parser.iter_visible_text(read())
+        parse_seconds = 0.0
+        try:
+            while True:
+                start, waited_before = time.perf_counter(), waited
+                piece = next(pieces, None)
+                parse_seconds += time.perf_counter() - start - (waited - waited_before)
+                if piece is None:
+                    return
+                yield piece
+        finally:
+            pieces.close()
+            self.metrics.observe('crawler_parse_seconds', parse_seconds, op='iter_visible_text')
+
+    def element_strings(self, document, tags):
+        return self._timed('element_strings', lambda d, t: list(self.parser.element_strings(d, t)), document, tags)
+
+    def close(self):
+        close = getattr(self.parser, 'close', None)
+        if close is not None:
+            close()
+
+
+def response_recorder(metrics):
+    """requests response hook recording per-host requests, bytes downloaded and network time
+
+    Fires once per hop, redirects included. `elapsed` only covers the headers, so
+    reading the body is timed here too (it is read right after hooks anyway).
+    """
+    def record(response, *args, **kwargs):
+        network_seconds = response.elapsed.total_seconds()
+        if not kwargs.get('stream'):
+            start = time.perf_counter()
+            body = response.content
+            network_seconds += time.perf_counter() - start
+            # Bodies replayed from the HTTP cache weren't downloaded again
+            if not getattr(response, 'not_modified', False):
+                metrics.inc('crawler_bytes_downloaded_total', len(body))
+        metrics.inc('crawler_requests_total', host=urlparse(response.request.url).hostname or '')
+        metrics.inc('crawler_responses_total', code=f"{response.status_code // 100}xx")
+        metrics.observe('crawler_network_seconds', network_seconds)
+        return response
+    return record
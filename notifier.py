@@ -0,0 +1,214 @@
+import logging
+import queue
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class TelegramNotifier:
+    """Background Telegram sender that batches alerts and respects rate limits
+
+    `notify` only enqueues, so the crawl never waits on Telegram. A worker thread
+    coalesces messages that arrive within `batch_window` seconds into as few
+    sendMessage calls as fit in Telegram's 4096-character limit.
+    """
+
+    max_length = 4096
+    separator = '\n\n'
+
+    def __init__(self, token, chat_id, api_base='https://api.telegram.org', batch_window=2.0,
+                 timeout=10, max_retries=5, min_interval=1.0, session=None, metrics=None):
+        self.url = f"{api_base.rstrip('/')}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.batch_window = batch_window
+        self.timeout = timeout
+        self.max_retries = max_retries
+        # Telegram allows about one message per second to a single chat
+        self.min_interval = min_interval
+        self._last_send = 0.0
+        # One pooled keep-alive connection for every send
+        self.session = session or requests.Session()
+        self.queue = queue.Queue()
+        self.stats = {'queued': 0, 'sent': 0, 'failed': 0, 'rate_limited': 0}
+        self.metrics = metrics
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def notify(self, message):
+        """Queue a message for delivery and return immediately"""
+        self._ensure_started()
+        self.stats['queued'] += 1
+        self.queue.put(message)
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='telegram', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                self.queue.task_done()
+                return
+
+            messages = [item]
+            stop = False
+            # Gather whatever else arrives shortly after, so a burst goes out together
+            deadline = time.monotonic() + self.batch_window
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self.queue.get(timeout=max(remaining, 0)) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                messages.append(item)
+
+            for parts in self.pack_groups(messages):
+                self._send_group(parts)
+            for _ in messages:
+                self.queue.task_done()
+
+            if stop:
+                self.queue.task_done()
+                return
+
+    def pack(self, messages):
+        """Combine messages into as few texts as possible, each within max_length"""
+        return [self.separator.join(parts) for parts in self.pack_groups(messages)]
+
+    def pack_groups(self, messages):
+        """The messages (or parts of over-long ones) that go into each text `pack` returns"""
+        groups = []
+        current = []
+        length = 0
+        for message in messages:
+            for part in self._split(message):
+                if current and length + len(self.separator) + len(part) > self.max_length:
+                    groups.append(current)
+                    current = []
+                length = length + len(self.separator) + len(part) if current else len(part)
+                current.append(part)
+        if current:
+            groups.append(current)
+        return groups
+
+    def _split(self, message):
+        """Split an over-long message on line boundaries (HTML tags never span lines here)"""
+        if len(message) <= self.max_length:
+            return [message]
+        parts = []
+        current = ''
+        for line in message.split('\n'):
+            while len(line) > self.max_length:
+                if current:
+                    parts.append(current)
+                    current = ''
+                parts.append(line[:self.max_length])
+                line = line[self.max_length:]
+            if current and len(current) + 1 + len(line) > self.max_length:
+                parts.append(current)
+                current = line
+            else:
+                current = f"{current}\n{line}" if current else line
+        if current:
+            parts.append(current)
+        return parts
+
+    def _send_group(self, parts):
+        """Send packed parts as one text; if Telegram rejects it, send them one by one"""
+        status = self._send(self.separator.join(parts))
+        if status == 400 and len(parts) > 1:
+            # One message Telegram can't parse shouldn't take the rest of the batch with it
+            logger.warning(f"Telegram rejected a batch of {len(parts)} messages, sending them separately")
+            for part in parts:
+                self._send(part)
+
+    def _send(self, text):
+        start = time.perf_counter()
+        try:
+            return self._deliver(text)
+        finally:
+            # Includes rate-limit waits and retries: the real cost of each alert batch
+            if self.metrics is not None:
+                self.metrics.observe('crawler_stage_seconds', time.perf_counter() - start, stage='telegram_send')
+
+    def _deliver(self, text):
+        """Send one text; returns the final status code, or None if every attempt failed"""
+        data = {
+            'chat_id': self.chat_id,
+            'text': text,
+            'parse_mode': 'HTML'
+        }
+        backoff = 1
+        for attempt in range(self.max_retries):
+            wait = self._last_send + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_send = time.monotonic()
+            try:
+                response = self.session.post(self.url, data=data, timeout=self.timeout)
+                if response.status_code == 200:
+                    self.stats['sent'] += 1
+                    logger.info("Telegram notification sent successfully")
+                    return response.status_code
+
+                if response.status_code == 429:
+                    self.stats['rate_limited'] += 1
+                    retry_after = self._retry_after(response)
+                    logger.warning(f"Telegram rate limited, retrying in {retry_after}s")
+                    time.sleep(retry_after)
+                    continue
+
+                if response.status_code < 500:
+                    # Bad request or auth problem: retrying won't help
+                    logger.error(f"Failed to send Telegram notification: {response.status_code}")
+                    self.stats['failed'] += 1
+                    return response.status_code
+                logger.warning(f"Telegram returned {response.status_code}, retrying")
+            except Exception as e:
+                logger.warning(f"Error sending Telegram notification: {e}")
+
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+        self.stats['failed'] += 1
+        logger.error("Giving up on Telegram notification")
+        return None
+
+    def _retry_after(self, response):
+        try:
+            return int(response.json().get('parameters', {}).get('retry_after', 1))
+        except Exception:
+            return int(response.headers.get('Retry-After', 1) or 1)
+
+    def flush(self, timeout=60):
+        """Wait until every queued message has been sent (or given up on)"""
+        if self._thread is None:
+            return True
+        deadline = time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning("Timed out flushing Telegram notifications")
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=60):
+        """Flush pending notifications and stop the worker"""
+        if self._thread is None:
+            return
+        self.queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
@@ -0,0 +1,205 @@
+import logging
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+try:
+    from lxml import etree
+except ImportError:  # pragma: no cover - lxml is in requirements.txt, but stay usable without it
+    etree = None
+
+# Tags whose text never shows on the rendered page
+INVISIBLE_TAGS = ('script', 'style', 'noscript', 'template')
+
+
+class SoupParser:
+    """BeautifulSoup/html.parser backend (the original, slowest path)"""
+
+    name = 'html.parser'
+
+    def parse(self, content):
+        return BeautifulSoup(content, 'html.parser')
+
+    def visible_text(self, content):
+        soup = self.parse(content)
+        for element in soup(INVISIBLE_TAGS):
+            element.decompose()
+        return soup.get_text()
+
+    def iter_visible_text(self, chunks):
+        """Visible text of a body given in chunks (html.parser needs the whole body first)"""
+        yield self.visible_text(b''.join(chunks))
+
+    def links(self, content, css_class=None):
+        """List of (href, anchor text) for every <a href>, or only those with class `css_class`"""
+        attrs = {'class': css_class} if css_class else {}
+        anchors = self.parse(content).find_all('a', attrs, href=True)
+        return [(a.get('href', ''), a.get_text()) for a in anchors]
+
+    def element_strings(self, document, tags):
+        """(element, text) for each element in `tags` whose text is a single string
+
+        Same selection as `find_all(tags, string=...)`: elements holding exactly one
+        text node, possibly through a chain of single-child wrappers.
+        """
+        for element in document.find_all(tags):
+            if element.string:
+                yield element, element.string
+
+
+class LxmlParser:
+    """lxml backend with streaming fast paths for links and visible text"""
+
+    name = 'lxml'
+
+    def parse(self, content):
+        parser = etree.HTMLParser(remove_comments=True, recover=True)
+        try:
+            root = etree.fromstring(content, parser)
+        except etree.XMLSyntaxError:
+            root = None
+        if root is None:
+            # Empty or non-HTML body
+            root = etree.fromstring(b'<html></html>', parser)
+        return root
+
+    def visible_text(self, content):
+        root = self.parse(content)
+        etree.strip_elements(root, *INVISIBLE_TAGS, with_tail=False)
+        return ''.join(root.itertext())
+
+    def iter_visible_text(self, chunks):
+        """Visible text pieces as each element closes, keeping memory flat
+
+        Pieces come out per element rather than in document order, which is
+        enough for containment checks that may stop after any piece.
+        """
+        parser = etree.HTMLPullParser(events=('end',), remove_comments=True, recover=True)
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from self._read_text(parser)
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        yield from self._read_text(parser)
+
+    def _read_text(self, parser):
+        for _, element in parser.read_events():
+            if element.tag not in INVISIBLE_TAGS:
+                # Children are complete (and already scanned), so their tails are final
+                for text in [element.text] + [child.tail for child in element]:
+                    if text and text.strip():
+                        yield text
+            del element[:]
+
+    def links(self, content, css_class=None, chunk_size=64 * 1024):
+        """List of (href, anchor text), pulled from the parser as each </a> closes
+
+        With `css_class`, only links having that class are returned.
+        """
+        parser = etree.HTMLPullParser(events=('end',), tag='a', remove_comments=True, recover=True)
+        links = []
+        for start in range(0, len(content), chunk_size):
+            parser.feed(content[start:start + chunk_size])
+            links.extend(self._read_links(parser, css_class))
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        links.extend(self._read_links(parser, css_class))
+        return links
+
+    def _read_links(self, parser, css_class=None):
+        for _, element in parser.read_events():
+            href = element.get('href')
+            if href is None or (css_class and css_class not in (element.get('class') or '').split()):
+                continue
+            yield href, ''.join(element.itertext())
+
+    def element_strings(self, document, tags):
+        """(element, text) for each element in `tags` whose text is a single string
+
+        Same selection as BeautifulSoup's `find_all(tags, string=...)`.
+        """
+        for element in document.iter(*tags):
+            text = single_string(element)
+            if text:
+                yield element, text
+
+
+def single_string(element):
+    """lxml equivalent of BeautifulSoup's Tag.string"""
+    children = list(element)
+    nodes = (1 if element.text else 0) + len(children) + sum(1 for child in children if child.tail)
+    if nodes != 1:
+        return None
+    if element.text:
+        return element.text
+    return single_string(children[0])
+
+
+def get_parser(name=None):
+    """Return the parser backend called `name`, preferring lxml when available"""
+    if name in (None, 'lxml'):
+        if etree is not None:
+            return LxmlParser()
+        if name == 'lxml':
+            logger.warning("lxml is not installed; falling back to html.parser")
+    return SoupParser()
+
+
+# Backend used inside each ParserPool worker process
+_worker_parser = None
+
+
+def _init_worker(name):
+    global _worker_parser
+    _worker_parser = get_parser(name)
+
+
+def _worker_visible_text(content):
+    return _worker_parser.visible_text(content)
+
+
+def _worker_links(content, css_class=None):
+    return list(_worker_parser.links(content, css_class))
+
+
+def _worker_element_strings(content, tags):
+    return [text for _, text in _worker_parser.element_strings(_worker_parser.parse(content), tags)]
+
+
+class ParserPool:
+    """Runs another backend's parsing in worker processes, outside the GIL
+
+    Same interface as the backends, but parse trees never cross the process
+    boundary: `parse` keeps the raw body and `element_strings` re-parses it in a
+    worker, returning only the text (elements come back as None).
+    """
+
+    def __init__(self, name=None, workers=None):
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.name = get_parser(name).name
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self.name,))
+
+    def parse(self, content):
+        return content
+
+    def visible_text(self, content):
+        return self.executor.submit(_worker_visible_text, content).result()
+
+    def iter_visible_text(self, chunks):
+        yield self.visible_text(b''.join(chunks))
+
+    def links(self, content, css_class=None):
+        return self.executor.submit(_worker_links, content, css_class).result()
+
+    def element_strings(self, document, tags):
+        texts = self.executor.submit(_worker_element_strings, document, tuple(tags)).result()
+        return [(None, text) for text in texts]
+
+    def close(self):
+        self.executor.shutdown()
@@ -0,0 +1,278 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from page_parser import get_parser
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Bodies worth reading; anything else (PDFs, images, archives) is rejected from the headers
+TEXT_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain', 'text/xml', 'application/xml')
+
+
+def accepts_content_type(headers):
+    """Whether a response's Content-Type (if any) is something we can scan"""
+    content_type = headers.get('Content-Type', '').split(';')[0].strip().lower()
+    return not content_type or content_type in TEXT_CONTENT_TYPES
+
+
+class Page:
+    """A fetched page: the response body plus its lazily parsed views
+
+    Pages built with `from_response` read the body from a streamed response only
+    as far as callers need it, up to `max_bytes` and `read_timeout` seconds of
+    reading. Scanners can stop early through `iter_chunks`; `content` reads the
+    rest.
+    """
+
+    def __init__(self, url, status_code, headers, content, not_modified=False, parser=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.not_modified = not_modified
+        self.parser = parser or get_parser()
+        # Body so far while streaming; `_content` once reading has finished
+        self._body = None
+        self._content = content
+        self._response = None
+        self._stream = None
+        self._lock = threading.RLock()
+        self.max_bytes = None
+        self.read_timeout = None
+        self.read_seconds = 0.0
+        # Cut short by the byte cap, the read timeout, an error or `close`
+        self.truncated = False
+        # Not read at all because of its Content-Type
+        self.rejected = False
+        self.on_finish = None
+        self._document = None
+        self._text = None
+        self._links = None
+
+    @classmethod
+    def from_response(cls, response, parser=None, max_bytes=None, read_timeout=None, on_finish=None):
+        """Page over a `stream=True` response; `on_finish(page)` runs once reading stops"""
+        page = cls(response.url, response.status_code, response.headers, None,
+                   getattr(response, 'not_modified', False), parser)
+        page.max_bytes = max_bytes
+        page.read_timeout = read_timeout
+        page.on_finish = on_finish
+        page._body = bytearray()
+        page._response = response
+        if accepts_content_type(response.headers):
+            # Error pages are never scanned, so their connection is released straight away
+            if response.status_code == 200:
+                page._stream = response.iter_content(CHUNK_SIZE)
+        else:
+            page.rejected = True
+        if page._stream is None:
+            page._finish()
+        return page
+
+    @property
+    def streaming(self):
+        """Whether part of the body is still waiting on the network"""
+        return self._stream is not None
+
+    def _data(self):
+        return self._content if self._content is not None else self._body
+
+    def _read_more(self):
+        """Append the next chunk from the network; False once the body is done"""
+        if self._stream is None:
+            return False
+        start = time.perf_counter()
+        try:
+            chunk = next(self._stream)
+        except StopIteration:
+            self._finish()
+            return False
+        except Exception as e:
+            logger.debug(f"Stopped reading {self.url}: {e}")
+            self.truncated = True
+            self._finish()
+            return False
+        finally:
+            self.read_seconds += time.perf_counter() - start
+
+        if self.max_bytes is not None and len(self._body) + len(chunk) > self.max_bytes:
+            chunk = chunk[:self.max_bytes - len(self._body)]
+            self.truncated = True
+        self._body += chunk
+        # Endless streams end here rather than at the server's whim
+        if self.read_timeout is not None and self.read_seconds > self.read_timeout:
+            self.truncated = True
+        if self.truncated:
+            self._finish()
+        return True
+
+    def _finish(self):
+        if self._response is not None:
+            # Drops the connection if the body wasn't read to the end, else returns it to the pool
+            self._response.close()
+            self._response = None
+        self._stream = None
+        if self._content is None:
+            self._content = bytes(self._body)
+            self._body = None
+        if self.on_finish is not None:
+            on_finish, self.on_finish = self.on_finish, None
+            on_finish(self)
+
+    def iter_chunks(self):
+        """Yield the body chunk by chunk, reading from the network only as far as consumed"""
+        offset = 0
+        while True:
+            with self._lock:
+                if offset >= len(self._data()) and not self._read_more():
+                    return
+                chunk = bytes(self._data()[offset:offset + CHUNK_SIZE])
+            offset += len(chunk)
+            if chunk:
+                yield chunk
+
+    def close(self, blocking=True):
+        """Stop reading; whatever was read so far becomes the page body
+
+        With `blocking=False` a page another thread is reading is left alone,
+        and False is returned.
+        """
+        if not self._lock.acquire(blocking):
+            return False
+        try:
+            if self._stream is not None:
+                self.truncated = True
+                self._finish()
+            return True
+        finally:
+            self._lock.release()
+
+    @property
+    def content(self):
+        with self._lock:
+            while self._read_more():
+                pass
+            return self._content
+
+    @property
+    def size(self):
+        # No lock: the store measures pages while a reader may hold it on the network
+        return len(self._data())
+
+    @property
+    def document(self):
+        """Full parse tree, built on first use and then shared by every caller"""
+        if self._document is None:
+            self._document = self.parser.parse(self.content)
+        return self._document
+
+    @property
+    def text(self):
+        """Lower-cased visible text (script/style skipped), without keeping a tree"""
+        if self._text is None:
+            self._text = self.parser.visible_text(self.content).lower()
+        return self._text
+
+    def iter_text(self):
+        """Visible text in pieces as the body arrives, for scans that can stop early"""
+        if self._text is not None:
+            return iter([self._text])
+        return (piece.lower() for piece in self.parser.iter_visible_text(self.iter_chunks()))
+
+    @property
+    def links(self):
+        """(href, anchor text) pairs for every <a href> on the page"""
+        if self._links is None:
+            self._links = self.parser.links(self.content)
+        return self._links
+
+    def element_strings(self, tags):
+        return self.parser.element_strings(self.document, tags)
+
+
+class PageStore:
+    """Per-run LRU of fetched pages with a byte budget, keyed by final URL after redirects"""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_streaming=16):
+        self.max_bytes = max_bytes
+        self.max_streaming = max_streaming
+        self.total_bytes = 0
+        self._pages = OrderedDict()
+        # Requested URL -> final URL, so a redirecting URL is fetched once too
+        self._aliases = {}
+        self._lock = threading.Lock()
+        self._fetch_locks = {}
+        self.stats = {'hits': 0, 'fetches': 0}
+
+    def get(self, url):
+        with self._lock:
+            key = self._aliases.get(url, url)
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+            return page
+
+    def put(self, url, page):
+        with self._lock:
+            if page.size > self.max_bytes:
+                return
+            old = self._pages.pop(page.url, None)
+            if old is not None and old is not page:
+                old.close(blocking=False)
+            self._pages[page.url] = page
+            if url != page.url:
+                self._aliases[url] = page.url
+
+            # Streamed pages grow as they're read, so re-measure before evicting
+            self.total_bytes = sum(stored.size for stored in self._pages.values())
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._pages.popitem(last=False)
+                self.total_bytes -= evicted.size
+                evicted.close(blocking=False)
+
+            # Each half-read page holds a connection open. The oldest ones are dropped
+            # rather than kept cut short, so the next fetch reads them again in full
+            streaming = [key for key, stored in self._pages.items() if stored.streaming]
+            for key in streaming[:max(0, len(streaming) - self.max_streaming)]:
+                stored = self._pages[key]
+                if stored.close(blocking=False):
+                    del self._pages[key]
+                    self.total_bytes -= stored.size
+
+    def get_or_fetch(self, url, fetch):
+        """Return the stored page for `url`, calling `fetch(url)` at most once per URL"""
+        page = self.get(url)
+        if page is not None:
+            self._count('hits')
+            return page
+
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(url, threading.Lock())
+        # Concurrent callers for the same URL wait for the first fetch instead of repeating it
+        with fetch_lock:
+            page = self.get(url)
+            if page is not None:
+                self._count('hits')
+                return page
+            page = fetch(url)
+            self._count('fetches')
+            self.put(url, page)
+
+        with self._lock:
+            self._fetch_locks.pop(url, None)
+        return page
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def clear(self):
+        with self._lock:
+            for page in self._pages.values():
+                page.close(blocking=False)
+            self._pages.clear()
+            self._aliases.clear()
+            self.total_bytes = 0
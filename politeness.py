@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class HostUnavailable(requests.exceptions.ConnectionError):
+    """Raised instead of contacting a host whose circuit breaker is open"""
+
+
+class HostState:
+    """Token bucket and failure tracking for one host"""
+
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.failures = 0
+        self.open_until = 0.0
+
+
+class HostScheduler:
+    """Per-host token buckets with adaptive slow-down and circuit breaking
+
+    Every host gets `default_rate` requests/second (bursting to `burst`) unless
+    `host_rates` says otherwise. A 429/503 or Retry-After halves the host's rate
+    and pauses it for up to `max_retry_after` seconds; successes restore the rate
+    gradually. After `failure_threshold` consecutive timeouts/errors/throttled
+    responses, or a longer Retry-After, the host's circuit opens and requests
+    to it fail fast for `cooldown` seconds (or until the Retry-After passes).
+    """
+
+    def __init__(self, default_rate=10.0, burst=10, host_rates=None, min_rate=0.1,
+                 failure_threshold=5, cooldown=300, max_retry_after=60):
+        self.default_rate = default_rate
+        self.burst = burst
+        self.host_rates = host_rates or {}
+        self.min_rate = min_rate
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_retry_after = max_retry_after
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self.stats = {'requests': 0, 'waited_seconds': 0.0, 'throttled': 0, 'circuits_opened': 0, 'rejected': 0}
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            rate = self.host_rates.get(host, self.default_rate)
+            state = self._hosts[host] = HostState(rate, min(self.burst, max(1, rate)))
+        return state
+
+    def acquire(self, url):
+        """Wait for a request slot on the URL's host, or raise HostUnavailable"""
+        host = urlparse(url).hostname or ''
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+            if state.open_until > now:
+                self.stats['rejected'] += 1
+                raise HostUnavailable(f"Circuit open for {host}")
+
+            state.tokens = min(state.burst, state.tokens + (now - state.updated) * state.rate)
+            state.updated = now
+            # Take the token now (possibly going negative) so concurrent callers queue up
+            state.tokens -= 1
+            delay = max(-state.tokens / state.rate if state.tokens < 0 else 0.0,
+                        state.blocked_until - now)
+            self.stats['requests'] += 1
+            self.stats['waited_seconds'] += delay
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, url, response=None, error=None):
+        """Feed the outcome of a request back into the host's rate and breaker"""
+        host = urlparse(url).hostname or ''
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+
+            if response is not None and response.status_code in (429, 503):
+                self.stats['throttled'] += 1
+                state.rate = max(self.min_rate, state.rate / 2)
+                state.failures += 1
+                retry_after = retry_after_seconds(response)
+                if retry_after is not None and retry_after > self.max_retry_after:
+                    # Too long to keep workers sleeping on: fail fast until then instead
+                    self._open_circuit(host, state, now + retry_after)
+                    return
+                if state.failures >= self.failure_threshold:
+                    self._open_circuit(host, state, now + self.cooldown)
+                    return
+                state.blocked_until = max(state.blocked_until, now + (retry_after or 1 / state.rate))
+                logger.info(f"Slowing down {host} to {state.rate:.2f} req/s")
+                return
+
+            if error is not None or (response is not None and response.status_code >= 500):
+                state.failures += 1
+                if state.failures >= self.failure_threshold:
+                    self._open_circuit(host, state, now + self.cooldown)
+                return
+
+            # Healthy response: close the breaker and creep back towards full speed
+            state.failures = 0
+            state.open_until = 0.0
+            state.rate = min(state.max_rate, state.rate + state.max_rate / 10)
+
+    def _open_circuit(self, host, state, until):
+        # Caller holds the lock
+        if state.open_until > time.monotonic():
+            state.open_until = max(state.open_until, until)
+            return
+        state.open_until = until
+        self.stats['circuits_opened'] += 1
+        logger.warning(f"Circuit opened for {host} for {until - time.monotonic():.0f}s "
+                       f"after {state.failures} failures")
+
+    def summary(self):
+        with self._lock:
+            return dict(self.stats, hosts=len(self._hosts))
+
+
+def retry_after_seconds(response):
+    """Parse a Retry-After header (delta-seconds or HTTP date)"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class PoliteSession(requests.Session):
+    """requests.Session whose every request (including redirect hops) goes through a HostScheduler
+
+    With `user_agents`, requests that don't set their own User-Agent get the
+    one picked for their host.
+    """
+
+    def __init__(self, scheduler=None, user_agents=None):
+        super().__init__()
+        self.scheduler = scheduler
+        self.user_agents = user_agents
+        if user_agents is not None:
+            del self.headers['User-Agent']
+
+    def send(self, request, **kwargs):
+        if self.user_agents is not None and 'User-Agent' not in request.headers:
+            request.headers['User-Agent'] = self.user_agents.for_host(urlparse(request.url).hostname)
+        if self.scheduler is None:
+            return super().send(request, **kwargs)
+
+        self.scheduler.acquire(request.url)
+        try:
+            response = super().send(request, **kwargs)
+        except requests.RequestException as e:
+            self.scheduler.record(request.url, error=e)
+            raise
+        self.scheduler.record(request.url, response=response)
+        return response
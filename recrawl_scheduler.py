@@ -0,0 +1,170 @@
+import heapq
+import logging
+import sqlite3
+import time
+
+from sqlite_store import SqliteStore
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# (base interval, cap) before the next visit, per outcome of the last crawl.
+# Failures back off exponentially from the base with each consecutive repeat.
+OUTCOME_INTERVALS = {
+    'hit': (12 * HOUR, 2 * DAY),              # new postings appeared
+    'no_change': (DAY, 14 * DAY),             # hiring, but nothing new
+    'no_jobs': (3 * DAY, 60 * DAY),
+    'no_career_pages': (7 * DAY, 90 * DAY),
+    'no_website': (14 * DAY, 180 * DAY),
+    'error': (HOUR, 7 * DAY),                 # usually transient
+}
+FAILURE_OUTCOMES = {'no_jobs', 'no_career_pages', 'no_website', 'error'}
+
+
+class RecrawlQueue(SqliteStore):
+    """Persistent min-heap of companies keyed by when they are next due
+
+    The interval to the next visit comes from the last outcome, the company's
+    hit rate and how long ago its postings last changed, so each run's budget
+    goes to the companies most likely to have new jobs.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS schedule (
+            company TEXT PRIMARY KEY,
+            next_due REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            hits INTEGER NOT NULL DEFAULT 0,
+            failures INTEGER NOT NULL DEFAULT 0,
+            last_outcome TEXT,
+            last_change REAL,
+            last_crawled REAL
+        )
+    """
+
+    def __init__(self, path='recrawl_queue.sqlite', monitor_hours=24):
+        super().__init__(path)
+        self.monitor_interval = monitor_hours * HOUR
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT company, next_due, attempts, hits, failures, last_outcome, last_change, last_crawled FROM schedule"
+            ).fetchall()
+
+        self.entries = {}
+        for company, next_due, attempts, hits, failures, last_outcome, last_change, last_crawled in rows:
+            self.entries[company] = {
+                'next_due': next_due, 'attempts': attempts, 'hits': hits, 'failures': failures,
+                'last_outcome': last_outcome, 'last_change': last_change, 'last_crawled': last_crawled,
+            }
+        self.heap = [(entry['next_due'], company) for company, entry in self.entries.items()]
+        heapq.heapify(self.heap)
+        logger.info(f"Loaded {len(self.entries)} scheduled companies")
+
+    def __contains__(self, company_name):
+        return company_name in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def is_due(self, company_name, now=None):
+        entry = self.entries.get(company_name)
+        return entry is None or entry['next_due'] <= (now or time.time())
+
+    def interval(self, entry, outcome, now):
+        """Seconds until the next visit after `outcome`"""
+        base, cap = OUTCOME_INTERVALS.get(outcome, OUTCOME_INTERVALS['error'])
+        if outcome == 'no_change':
+            base = self.monitor_interval
+            # Boards that haven't changed in a while are checked less often
+            if entry['last_change']:
+                base *= 1 + (now - entry['last_change']) / (7 * DAY)
+        elif outcome == 'hit':
+            base = min(base, self.monitor_interval)
+        elif outcome in FAILURE_OUTCOMES:
+            base *= 2 ** max(0, entry['failures'] - 1)
+
+        # Companies that have produced jobs before get looked at sooner
+        hit_rate = entry['hits'] / entry['attempts'] if entry['attempts'] else 0
+        return min(cap, base * (1 - 0.5 * hit_rate))
+
+    def record(self, company_name, outcome, now=None):
+        """Reschedule a company after a crawl with the given outcome"""
+        now = now or time.time()
+        with self._lock:
+            entry = self.entries.get(company_name) or {
+                'next_due': 0, 'attempts': 0, 'hits': 0, 'failures': 0,
+                'last_outcome': None, 'last_change': None, 'last_crawled': None,
+            }
+            entry['attempts'] += 1
+            if outcome == 'hit':
+                entry['hits'] += 1
+                entry['last_change'] = now
+            if outcome in FAILURE_OUTCOMES:
+                # Consecutive failures of the same kind back off further
+                entry['failures'] = entry['failures'] + 1 if entry['last_outcome'] == outcome else 1
+            else:
+                entry['failures'] = 0
+            entry['last_outcome'] = outcome
+            entry['last_crawled'] = now
+            entry['next_due'] = now + self.interval(entry, outcome, now)
+
+            self.entries[company_name] = entry
+            heapq.heappush(self.heap, (entry['next_due'], company_name))
+            self._save(company_name, entry)
+            return entry['next_due']
+
+    def seed(self, company_name, outcome, failures=0, now=None):
+        """Import a company from older progress files without counting a crawl"""
+        now = now or time.time()
+        with self._lock:
+            if company_name in self.entries:
+                return
+            entry = {
+                'next_due': 0, 'attempts': 0, 'hits': 0, 'failures': failures,
+                'last_outcome': outcome, 'last_change': None, 'last_crawled': None,
+            }
+            if outcome in FAILURE_OUTCOMES:
+                entry['next_due'] = now + self.interval(entry, outcome, now)
+            self.entries[company_name] = entry
+            heapq.heappush(self.heap, (entry['next_due'], company_name))
+            self._save(company_name, entry)
+
+    def _save(self, company_name, entry):
+        try:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO schedule VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (company_name, entry['next_due'], entry['attempts'], entry['hits'], entry['failures'],
+                     entry['last_outcome'], entry['last_change'], entry['last_crawled'])
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Error saving schedule for {company_name}: {e}")
+
+    def pop_due(self, limit, now=None):
+        """Take up to `limit` companies whose next visit is due, most overdue first"""
+        now = now or time.time()
+        due = []
+        with self._lock:
+            while self.heap and len(due) < limit and self.heap[0][0] <= now:
+                next_due, company = heapq.heappop(self.heap)
+                # Lazy deletion: skip heap entries superseded by a later reschedule
+                entry = self.entries.get(company)
+                if entry is None or entry['next_due'] != next_due or company in due:
+                    continue
+                due.append(company)
+        return due
+
+    def plan(self, budget, new_companies, explore_fraction=0.3):
+        """Pick this run's companies: due known companies first, with a share kept for new ones
+
+        `new_companies(n)` returns up to n companies not yet in the queue.
+        """
+        reserve = int(budget * explore_fraction) if budget > 1 else 0
+        planned = self.pop_due(budget - reserve)
+        planned += new_companies(budget - len(planned))
+        if len(planned) < budget:
+            # Not enough new companies: give the rest of the budget back to due ones
+            planned += self.pop_due(budget - len(planned))
+        return planned
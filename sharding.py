@@ -0,0 +1,105 @@
+import argparse
+import hashlib
+import logging
+import os
+
+from state_store import StateStore
+
+logger = logging.getLogger(__name__)
+
+
+def shard_of(company_name, count):
+    """1-based shard owning a company; stable across runs, machines and Python versions"""
+    digest = hashlib.blake2b(company_name.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count + 1
+
+
+class Shard:
+    """One of `count` deterministic partitions of the company list, written as "i/N" """
+
+    def __init__(self, index, count):
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f"Invalid shard {index}/{count}")
+        self.index = index
+        self.count = count
+
+    @classmethod
+    def parse(cls, spec):
+        try:
+            index, count = (int(part) for part in spec.split('/'))
+        except ValueError:
+            raise ValueError(f"Shard must look like i/N, got {spec!r}")
+        return cls(index, count)
+
+    def __str__(self):
+        return f"{self.index}/{self.count}"
+
+    def owns(self, company_name):
+        return shard_of(company_name, self.count) == self.index
+
+    def path(self, path):
+        """Per-shard variant of a state file, e.g. processed_companies.shard-2-of-4.json"""
+        root, ext = os.path.splitext(path)
+        return f"{root}.shard-{self.index}-of-{self.count}{ext}"
+
+
+def open_shard_state(shard, processed_file='processed_companies.json', failed_file='failed_companies.json',
+                     journal_file='crawler_state.journal'):
+    """StateStore for one shard, seeded with its companies from the merged files on first use"""
+    paths = [shard.path(processed_file), shard.path(failed_file), shard.path(journal_file)]
+    fresh = not any(os.path.exists(path) for path in paths)
+    state = StateStore(*paths)
+    if fresh and (os.path.exists(processed_file) or os.path.exists(failed_file)):
+        merged = StateStore(processed_file, failed_file, journal_file)
+        state.replace(
+            [name for name in merged.processed if shard.owns(name)],
+            {name: entry for name, entry in merged.failed.items() if shard.owns(name)}
+        )
+        merged.close()
+        logger.info(f"Seeded shard {shard} with {len(state.processed)} processed and {len(state.failed)} failed companies")
+    return state
+
+
+def merge_shards(count, directory='.', processed_file='processed_companies.json',
+                 failed_file='failed_companies.json', journal_file='crawler_state.journal'):
+    """Fold every shard's progress into the merged processed/failed files
+
+    Each company is taken from the shard that owns it, so an update (or a
+    removal) made by one shard can't be overwritten by another shard's stale
+    copy. Companies of shards with no output keep their merged entries.
+    """
+    merged = StateStore(*(os.path.join(directory, name) for name in (processed_file, failed_file, journal_file)))
+    merged_shards = set()
+    processed = {}
+    failed = {}
+
+    for index in range(1, count + 1):
+        shard = Shard(index, count)
+        paths = [os.path.join(directory, shard.path(name)) for name in (processed_file, failed_file, journal_file)]
+        if not any(os.path.exists(path) for path in paths):
+            logger.warning(f"No output for shard {shard}, keeping its merged entries")
+            continue
+        # Loading replays the shard's journal, so updates not yet compacted are kept too
+        state = StateStore(*paths)
+        processed.update((name, None) for name in state.processed if shard.owns(name))
+        failed.update((name, entry) for name, entry in state.failed.items() if shard.owns(name))
+        state.close()
+        merged_shards.add(index)
+
+    kept_processed = [name for name in merged.processed if shard_of(name, count) not in merged_shards]
+    kept_failed = {name: entry for name, entry in merged.failed.items() if shard_of(name, count) not in merged_shards}
+    merged.replace(kept_processed + list(processed), {**kept_failed, **failed})
+    merged.close()
+    logger.info(f"Merged {len(merged_shards)} of {count} shards")
+    return merged_shards
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    arg_parser = argparse.ArgumentParser(description="Combine per-shard crawler progress files")
+    arg_parser.add_argument('--shards', type=int, required=True, help="Number of shards the crawl was split into")
+    arg_parser.add_argument('--dir', default='.', help="Directory holding the shard files and merged output")
+    args = arg_parser.parse_args()
+
+    merge_shards(args.shards, args.dir)
@@ -0,0 +1,29 @@
+import sqlite3
+import threading
+
+
+class SqliteStore:
+    """One SQLite database shared by the crawler's threads behind a single lock
+
+    Subclasses give their tables as the `schema` script, run when the database
+    is opened, and upgrade databases written by older versions in `migrate`.
+    Statements go through `self.conn` while holding `self._lock`.
+    """
+
+    schema = ''
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self.conn:
+            self.conn.executescript(self.schema)
+            self.migrate()
+
+    def migrate(self):
+        pass
+
+    def close(self):
+        """Close the connection; safe to call more than once"""
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore:
+    """Processed/failed company state with O(1) lookups and an append-only journal
+
+    The JSON files remain the snapshot format (so existing progress files and the
+    workflow's summary step keep working). Individual updates are appended to a
+    journal and folded into the snapshot every `compact_every` updates.
+    """
+
+    def __init__(self, processed_file='processed_companies.json', failed_file='failed_companies.json',
+                 journal_file='crawler_state.journal', compact_every=500):
+        self.processed_file = processed_file
+        self.failed_file = failed_file
+        self.journal_file = journal_file
+        self.compact_every = compact_every
+
+        # dict used as an insertion-ordered set
+        self.processed = {}
+        self.failed = {}
+        self._lock = threading.RLock()
+        self._pending = 0
+
+        self.load()
+        self._journal = open(self.journal_file, 'a', encoding='utf-8')
+
+    def load(self):
+        """Load the JSON snapshots, then replay any journal written since"""
+        self.processed = dict.fromkeys(self._read_json(self.processed_file, []))
+        self.failed = self._read_json(self.failed_file, {})
+
+        replayed = 0
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A crash can leave a torn final line; everything before it is valid
+                        logger.warning(f"Ignoring malformed journal line in {self.journal_file}")
+                        continue
+                    self._apply(record)
+                    replayed += 1
+        self._pending = replayed
+
+        logger.info(f"Loaded {len(self.processed)} processed companies")
+        logger.info(f"Loaded {len(self.failed)} failed companies")
+        if replayed:
+            logger.info(f"Replayed {replayed} journal entries")
+
+    def _read_json(self, path, default):
+        try:
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading {path}: {e}")
+        return default
+
+    def _apply(self, record):
+        op = record.get('op')
+        if op == 'processed':
+            self.processed[record['company']] = None
+        elif op == 'failed':
+            self.failed[record['company']] = record['entry']
+        elif op == 'reset_processed':
+            # Only found in journals written before revisits moved to the recrawl queue
+            self.processed.clear()
+
+    def _append(self, record):
+        # Records carry full values rather than deltas, so replaying is idempotent
+        self._apply(record)
+        self._journal.write(json.dumps(record) + '\n')
+        self._pending += 1
+        if self._pending >= self.compact_every:
+            self.compact()
+
+    def is_processed(self, company_name):
+        return company_name in self.processed
+
+    def mark_processed(self, company_name):
+        with self._lock:
+            self._append({'op': 'processed', 'company': company_name})
+
+    def record_failure(self, company_name, reason, error=None):
+        """Increment the failure count for a company"""
+        with self._lock:
+            entry = dict(self.failed.get(company_name) or {'count': 0, 'reason': reason})
+            entry['count'] += 1
+            if error is not None:
+                entry['last_error'] = str(error)
+            self._append({'op': 'failed', 'company': company_name, 'entry': entry})
+
+    def replace(self, processed, failed):
+        """Swap in a whole new state (e.g. merged shards) and write it out"""
+        with self._lock:
+            self.processed = dict.fromkeys(processed)
+            self.failed = dict(failed)
+            self.compact()
+
+    def flush(self):
+        """Push buffered journal entries to disk"""
+        with self._lock:
+            self._journal.flush()
+
+    def compact(self):
+        """Rewrite the JSON snapshots and start a fresh journal"""
+        with self._lock:
+            try:
+                self._journal.flush()
+                self._write_json(self.processed_file, list(self.processed))
+                self._write_json(self.failed_file, self.failed)
+                # Snapshots are durable before the journal goes, so a crash in
+                # between only means replaying entries that are already applied
+                self._journal.close()
+                self._journal = open(self.journal_file, 'w', encoding='utf-8')
+                self._pending = 0
+                logger.info(f"Saved {len(self.processed)} processed companies and {len(self.failed)} failed companies")
+            except Exception as e:
+                logger.error(f"Error compacting crawler state: {e}")
+
+    def _write_json(self, path, data):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        self.compact()
+        with self._lock:
+            self._journal.close()
@@ -0,0 +1,82 @@
+import pytest
+import requests
+
+from ats import AtsClient, detect_boards
+from stub_server import StubServer, ats_routes
+
+# Where each provider's board shows up on a company site, and the first posting of its recorded feed
+BOARDS = {
+    'greenhouse': (
+        '<script src="https://boards.greenhouse.io/embed/job_board/js?for=acme"></script>',
+        {'title': 'Senior DevOps Engineer', 'location': 'London, United Kingdom',
+         'url': 'https://boards.greenhouse.io/acme/jobs/4012345'},
+    ),
+    'lever': (
+        '<a href="https://jobs.lever.co/acme">Open roles</a>',
+        {'title': 'Cloud Engineer', 'location': 'Manchester',
+         'url': 'https://jobs.lever.co/acme/5b1c2d3e-0000-4a4a-9b9b-123456789abc'},
+    ),
+    'workable': (
+        '<a href="https://acme.workable.com/">Careers</a>',
+        {'title': 'Infrastructure Engineer', 'location': 'Leeds, United Kingdom',
+         'url': 'https://apply.workable.com/j/A1B2C3D4E5'},
+    ),
+    'smartrecruiters': (
+        '<a href="https://careers.smartrecruiters.com/acme">Jobs</a>',
+        {'title': 'Senior Cloud Engineer', 'location': 'Bristol, gb',
+         'url': 'https://jobs.smartrecruiters.com/acme/743999912345678'},
+    ),
+    'ashby': (
+        '<iframe src="https://jobs.ashbyhq.com/acme?embed=js"></iframe>',
+        {'title': 'Site Reliability / DevOps Engineer', 'location': 'London',
+         'url': 'https://jobs.ashbyhq.com/acme/2f1e0d9c-8b7a-4c3d-9e8f-0a1b2c3d4e5f'},
+    ),
+}
+
+
+@pytest.fixture(scope='module')
+def client():
+    with StubServer(ats_routes()) as server:
+        yield AtsClient(requests.Session(), server.url)
+
+
+@pytest.mark.parametrize('text, boards', [
+    ('https://boards.greenhouse.io/embed/job_board/js?for=acme', [('greenhouse', 'acme')]),
+    ('https://boards.greenhouse.io/embed/job_board?for=acme', [('greenhouse', 'acme')]),
+    ('https://job-boards.eu.greenhouse.io/acme/jobs/1', [('greenhouse', 'acme')]),
+    ('https://jobs.eu.lever.co/acme/5b1c2d3e', [('lever', 'acme')]),
+    ('https://apply.workable.com/acme/', [('workable', 'acme')]),
+    ('https://apply.workable.com/api/v1/widget/accounts/acme', [('workable', 'acme')]),
+    ('https://acme.workable.com', [('workable', 'acme')]),
+    ('https://jobs.smartrecruiters.com/Acme/743999912345678', [('smartrecruiters', 'Acme')]),
+    ('https://jobs.ashbyhq.com/acme', [('ashby', 'acme')]),
+    # Path segments that are never a board token
+    ('https://boards.greenhouse.io/embed/', []),
+    ('https://www.workable.com/pricing', []),
+    ('<p>No job board here</p>', []),
+])
+def test_detect_boards(text, boards):
+    assert detect_boards(text) == boards
+
+
+def test_detect_boards_reports_each_board_once():
+    page = ('<a href="https://jobs.lever.co/acme">Jobs</a> <a href="https://jobs.lever.co/ACME/1">Role</a>'
+            '<script src="https://boards.greenhouse.io/embed/job_board/js?for=acme"></script>')
+
+    assert detect_boards(page) == [('greenhouse', 'acme'), ('lever', 'acme')]
+
+
+@pytest.mark.parametrize('provider', sorted(BOARDS))
+def test_recorded_feed_from_embedded_board(client, provider):
+    embed, first_posting = BOARDS[provider]
+
+    [(found_provider, token)] = detect_boards(embed)
+    jobs = client.fetch_jobs(found_provider, token)
+
+    assert found_provider == provider
+    assert jobs[0] == first_posting
+    assert all(job['title'] and job['url'] for job in jobs)
+
+
+def test_missing_board_reads_no_postings(client):
+    assert client.fetch_jobs('greenhouse', 'unknown') == []
@@ -0,0 +1,122 @@
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+import transport
+from http_cache import CachingAdapter, HttpCacheStore
+from stub_server import StubServer
+from transport import Resolver, Transport
+
+ETAG = '"v1"'
+
+
+def careers_page(handler):
+    if handler.headers.get('If-None-Match') == ETAG:
+        return 304, {'ETag': ETAG}, b''
+    return 200, {'Content-Type': 'text/html', 'ETag': ETAG}, b'<h1>Careers</h1>'
+
+
+@pytest.fixture
+def server():
+    with StubServer({'/careers': careers_page}) as server:
+        yield server
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CachingAdapter(HttpCacheStore(str(tmp_path / 'http_cache.sqlite')))
+
+
+def cached_session(adapter):
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Stands in for transport.Http2Adapter (which needs httpx) and records what it sends"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.sent = []
+
+    def accepts(self, verify=True, cert=None):
+        return verify is not False and cert is None
+
+    def send(self, request, **kwargs):
+        self.sent.append(dict(request.headers))
+        return super().send(request, **kwargs)
+
+
+def test_routed_host_is_revalidated_through_the_cache(server, cache):
+    http2 = RecordingAdapter()
+    cache.route(f"{server.url}/", http2)
+    session = cached_session(cache)
+
+    first = session.get(f"{server.url}/careers")
+    second = session.get(f"{server.url}/careers")
+
+    assert [headers.get('If-None-Match') for headers in http2.sent] == [None, ETAG]
+    assert not first.not_modified
+    assert second.not_modified and second.content == b'<h1>Careers</h1>'
+    assert cache.summary() == {'hits': 0, 'misses': 1, 'revalidated': 1}
+
+
+def test_routed_adapter_only_sends_what_it_accepts(server, cache):
+    http2 = RecordingAdapter()
+    cache.route(f"{server.url}/", http2)
+
+    cached_session(cache).get(f"{server.url}/careers", verify=False)
+
+    assert http2.sent == []
+
+
+def test_http2_hosts_are_routed_behind_the_cache(monkeypatch, cache):
+    monkeypatch.setattr(transport, 'Http2Adapter', lambda *args, **kwargs: RecordingAdapter())
+    session = requests.Session()
+
+    Transport(Resolver(), http2_hosts=['api.lever.co']).mount(session, cache)
+
+    assert session.get_adapter('https://api.lever.co/v0/postings/acme') is cache
+    assert isinstance(cache.routes['https://api.lever.co/'], RecordingAdapter)
+
+
+@pytest.mark.parametrize('headers, stored', [
+    ({'ETag': ETAG}, True),
+    ({'ETag': ETAG, 'Vary': 'Accept-Encoding'}, True),
+    ({'ETag': ETAG, 'Cache-Control': 'no-store'}, False),
+    ({'ETag': ETAG, 'Cache-Control': 'private, max-age=600'}, False),
+    ({'ETag': ETAG, 'Vary': 'Accept-Encoding, User-Agent'}, False),
+    ({'ETag': ETAG, 'Vary': '*'}, False),
+])
+def test_only_storable_responses_are_kept(cache, headers, stored):
+    routes = {'/page': (200, dict(headers, **{'Content-Type': 'text/html'}), b'<p>Jobs</p>')}
+    with StubServer(routes) as server:
+        cached_session(cache).get(f"{server.url}/page")
+
+        assert (cache.store.get(f"{server.url}/page") is not None) == stored
+
+
+def test_revalidated_page_is_replayed_from_the_cache(server, cache):
+    session = cached_session(cache)
+
+    first = session.get(f"{server.url}/careers")
+    second = session.get(f"{server.url}/careers")
+
+    assert server.requests == [('GET', '/careers'), ('GET', '/careers')]
+    assert not first.not_modified
+    assert second.not_modified and second.status_code == 200
+    assert second.content == first.content
+    assert cache.summary() == {'hits': 0, 'misses': 1, 'revalidated': 1}
+
+
+def test_fresh_page_is_served_without_a_request(cache):
+    routes = {'/jobs': (200, {'Content-Type': 'text/html', 'Cache-Control': 'max-age=600'}, b'<p>Jobs</p>')}
+    with StubServer(routes) as server:
+        session = cached_session(cache)
+        session.get(f"{server.url}/jobs")
+        replayed = session.get(f"{server.url}/jobs")
+
+        assert len(server.requests) == 1
+    assert replayed.not_modified and replayed.content == b'<p>Jobs</p>'
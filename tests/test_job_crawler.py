@@ -0,0 +1,35 @@
+import sqlite3
+
+import pytest
+
+from job_crawler import JobCrawler
+
+
+@pytest.fixture
+def crawler(tmp_path, monkeypatch):
+    # Every state file is created in the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('TELEGRAM_BOT_TOKEN', raising=False)
+    return JobCrawler()
+
+
+def test_run_is_single_use(crawler, tmp_path):
+    (tmp_path / 'companies.csv').write_text('Company\n')
+
+    assert crawler.run('companies.csv', max_companies=1) == []
+
+    assert crawler.closed
+    with pytest.raises(RuntimeError):
+        crawler.run('companies.csv', max_companies=1)
+
+
+def test_run_closes_the_sqlite_stores(crawler, tmp_path):
+    (tmp_path / 'companies.csv').write_text('Company\n')
+    stores = [crawler.http_cache.store, crawler.company_index, crawler.career_cache, crawler.wikipedia.cache,
+              crawler.website_cache, crawler.change_detector, crawler.recrawl]
+
+    crawler.run('companies.csv', max_companies=1)
+
+    for store in stores:
+        with pytest.raises(sqlite3.ProgrammingError):
+            store.conn.execute("SELECT 1")
@@ -0,0 +1,36 @@
+from keyword_matcher import KeywordMatcher
+
+KEYWORDS = ['devops engineer', 'senior devops engineer', 'cloud engineer', 'platform engineer']
+
+
+def test_synonyms_report_their_keyword():
+    matcher = KeywordMatcher(KEYWORDS, {'site reliability engineer': 'devops engineer', 'SRE': 'devops engineer'})
+
+    assert matcher.search('Site Reliability Engineer (London)') == {'devops engineer'}
+    assert matcher.ordered(matcher.search('Cloud Engineer / SRE')) == ['devops engineer', 'cloud engineer']
+
+
+def test_longer_phrases_imply_the_keywords_inside_them():
+    matcher = KeywordMatcher(KEYWORDS)
+
+    assert matcher.search('Senior DevOps Engineer') == {'senior devops engineer', 'devops engineer'}
+
+
+def test_matches_ignore_case_and_word_boundaries_like_a_substring_check():
+    matcher = KeywordMatcher(KEYWORDS)
+
+    # Same as `keyword in text.lower()`: plurals and run-on words still match
+    assert matcher.search('We are hiring Cloud Engineers') == {'cloud engineer'}
+    assert matcher.search('#platformengineer') == set()
+    assert matcher.search('platform engineering lead') == {'platform engineer'}
+    assert matcher.search('devops  engineer') == set()
+
+
+def test_scan_texts_maps_each_element_to_its_keywords():
+    matcher = KeywordMatcher(KEYWORDS)
+    elements = [(None, '\n  Senior DevOps Engineer '), (None, 'Office Manager'), (None, 'Cloud Engineer')]
+
+    assert matcher.scan_texts(elements) == {
+        'Senior DevOps Engineer': ['devops engineer', 'senior devops engineer'],
+        'Cloud Engineer': ['cloud engineer'],
+    }
@@ -0,0 +1,123 @@
+import html
+import time
+
+import pytest
+
+from notifier import TelegramNotifier
+from stub_server import FakeBotApi, StubServer, telegram_routes
+from transport import Resolver, Transport
+
+
+@pytest.fixture
+def bot_api():
+    return FakeBotApi(messages_per_second=1000)
+
+
+@pytest.fixture
+def server(bot_api):
+    with StubServer(telegram_routes(bot_api)) as server:
+        yield server
+
+
+def make_notifier(server, **kwargs):
+    kwargs.setdefault('min_interval', 0)
+    kwargs.setdefault('batch_window', 0.05)
+    return TelegramNotifier('TEST', '42', api_base=server.url, **kwargs)
+
+
+def alert(i):
+    return f"🎉 <b>Job Alert!</b>\n\n<b>Company:</b> Company {i}\n" + '\n'.join(f"• Position {j}" for j in range(20))
+
+
+def test_pack_fills_each_message_up_to_the_limit():
+    notifier = TelegramNotifier('TEST', '42')
+    messages = [alert(i) for i in range(30)]
+
+    batches = notifier.pack(messages)
+
+    assert len(batches) < len(messages)
+    assert all(len(batch) <= TelegramNotifier.max_length for batch in batches)
+    # Nothing lost or reordered, and a batch is only closed when the next alert wouldn't fit
+    assert notifier.separator.join(batches) == notifier.separator.join(messages)
+    shortest = min(len(message) for message in messages)
+    for batch in batches[:-1]:
+        assert len(batch) + len(notifier.separator) + shortest > TelegramNotifier.max_length
+
+
+def test_split_breaks_long_messages_on_lines():
+    notifier = TelegramNotifier('TEST', '42')
+    message = '\n'.join(f"• Line {i:04d} " + 'x' * 80 for i in range(100))
+    assert len(message) > 2 * TelegramNotifier.max_length
+
+    parts = notifier._split(message)
+
+    assert len(parts) == 3
+    assert all(len(part) <= TelegramNotifier.max_length for part in parts)
+    assert '\n'.join(parts) == message
+
+
+def test_split_cuts_a_single_over_long_line():
+    notifier = TelegramNotifier('TEST', '42')
+    message = 'intro\n' + 'y' * 5000
+
+    parts = notifier._split(message)
+
+    assert parts == ['intro', 'y' * 4096, 'y' * 904]
+
+
+def test_deliver_waits_retry_after_when_rate_limited(server, bot_api):
+    bot_api.min_interval = 1.0
+    notifier = make_notifier(server)
+
+    assert notifier._deliver('first') == 200
+    start = time.monotonic()
+    assert notifier._deliver('second') == 200
+
+    # The fake answers the burst with 429 and retry_after=1
+    assert time.monotonic() - start >= 1
+    assert bot_api.rejected == 1
+    assert bot_api.messages == ['first', 'second']
+    assert notifier.stats == {'queued': 0, 'sent': 2, 'failed': 0, 'rate_limited': 1}
+
+
+def test_close_flushes_queued_alerts(server, bot_api):
+    notifier = make_notifier(server)
+    messages = [alert(i) for i in range(30)] + ['\n'.join('z' * 90 for _ in range(100))]
+
+    for message in messages:
+        notifier.notify(message)
+    notifier.close()
+
+    assert notifier._thread is None
+    assert 1 < len(bot_api.messages) < len(messages)
+    assert all(len(text) <= TelegramNotifier.max_length for text in bot_api.messages)
+    assert notifier.stats['sent'] == len(bot_api.messages)
+    sent = '\n\n'.join(bot_api.messages)
+    assert all(f"Company {i}\n" in sent for i in range(30))
+
+
+def test_rejected_batch_is_resent_message_by_message(server, bot_api):
+    notifier = make_notifier(server)
+    messages = [f"<b>Company:</b> {html.escape('M&S Ltd')}", '<b>Company:</b> AT&T', '<b>Company:</b> Acme']
+
+    for message in messages:
+        notifier.notify(message)
+    notifier.close()
+
+    # The unescaped "&" sinks the packed batch and then only its own message
+    assert bot_api.rejected == 2
+    assert bot_api.messages == [messages[0], messages[2]]
+    assert notifier.stats['sent'] == 2
+    assert notifier.stats['failed'] == 2
+
+
+def test_sends_over_the_shared_transport(server, bot_api):
+    transport = Transport(Resolver())
+    notifier = make_notifier(server, session=transport.session())
+
+    notifier.notify('<b>Job Alert!</b>')
+    notifier.close()
+    transport.close()
+
+    assert bot_api.messages == ['<b>Job Alert!</b>']
+    assert transport.summary()['connections'] == 1
@@ -0,0 +1,37 @@
+import requests
+
+from page_store import Page, PageStore
+from stub_server import StubServer
+
+ROUTES = {
+    '/careers': (200, {'Content-Type': 'text/html'}, b'<p>Jobs</p>' * 50000),
+    '/gone': (404, {'Content-Type': 'text/html'}, b'<p>Not found</p>' * 1000),
+}
+
+
+def fetch(session, url, finished):
+    return Page.from_response(session.get(url, stream=True), on_finish=finished.append)
+
+
+def test_error_pages_release_their_connection_at_once():
+    finished = []
+    with StubServer(ROUTES) as server:
+        page = fetch(requests.Session(), f"{server.url}/gone", finished)
+
+    assert page.status_code == 404
+    assert not page.streaming
+    assert finished == [page] and page.content == b''
+
+
+def test_clear_finishes_half_read_pages():
+    finished = []
+    store = PageStore()
+    with StubServer(ROUTES) as server:
+        page = store.get_or_fetch(f"{server.url}/careers", lambda url: fetch(requests.Session(), url, finished))
+        next(page.iter_chunks())
+        assert page.streaming
+
+        store.clear()
+
+    assert finished == [page]
+    assert not page.streaming and page.truncated
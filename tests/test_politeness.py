@@ -0,0 +1,57 @@
+import pytest
+import requests
+
+from politeness import HostScheduler, HostUnavailable
+
+URL = 'https://example.co.uk/careers'
+
+
+def response(status_code, **headers):
+    reply = requests.Response()
+    reply.status_code = status_code
+    reply.headers.update(headers)
+    return reply
+
+
+def host_state(scheduler):
+    return scheduler._hosts['example.co.uk']
+
+
+def test_throttled_host_halves_its_rate_and_recovers():
+    scheduler = HostScheduler(default_rate=8.0)
+    scheduler.acquire(URL)
+
+    scheduler.record(URL, response(429))
+    scheduler.record(URL, response(503, **{'Retry-After': '2'}))
+
+    state = host_state(scheduler)
+    assert state.rate == 2.0
+    assert state.blocked_until > 0
+    assert scheduler.summary()['throttled'] == 2
+
+    # Each success gives back a tenth of the full rate
+    scheduler.record(URL, response(200))
+    assert state.rate == pytest.approx(2.8)
+    assert state.failures == 0
+
+
+def test_repeated_failures_open_the_circuit():
+    scheduler = HostScheduler(failure_threshold=3, cooldown=60)
+
+    for _ in range(3):
+        scheduler.record(URL, error=requests.ConnectionError())
+
+    with pytest.raises(HostUnavailable):
+        scheduler.acquire(URL)
+    # Other hosts are unaffected
+    scheduler.acquire('https://another.co.uk/')
+    assert scheduler.summary()['circuits_opened'] == 1
+
+
+def test_long_retry_after_opens_the_circuit_instead_of_sleeping():
+    scheduler = HostScheduler(max_retry_after=60)
+
+    scheduler.record(URL, response(429, **{'Retry-After': '3600'}))
+
+    with pytest.raises(HostUnavailable):
+        scheduler.acquire(URL)
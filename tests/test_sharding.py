@@ -0,0 +1,54 @@
+import json
+
+from sharding import Shard, merge_shards, shard_of
+from state_store import StateStore
+
+COMPANIES = [f"Company {i} Ltd" for i in range(40)]
+
+
+def read(path):
+    return json.loads(path.read_text())
+
+
+def shard_store(tmp_path, shard):
+    return StateStore(*(str(tmp_path / shard.path(name))
+                        for name in ('processed_companies.json', 'failed_companies.json', 'crawler_state.journal')))
+
+
+def test_merge_takes_each_company_from_its_own_shard(tmp_path):
+    merged = StateStore(str(tmp_path / 'processed_companies.json'), str(tmp_path / 'failed_companies.json'),
+                        str(tmp_path / 'crawler_state.journal'))
+    merged.replace(COMPANIES[:10], {})
+    merged.close()
+
+    first, second = Shard(1, 2), Shard(2, 2)
+    # Shard 1 wrote everything it owns; a stale copy of a shard 2 company must lose
+    one = shard_store(tmp_path, first)
+    stale = next(name for name in COMPANIES[:10] if second.owns(name))
+    one.replace([name for name in COMPANIES if first.owns(name)], {stale: {'count': 9, 'reason': 'error'}})
+    one.close()
+    # Shard 2's update is only in its journal, not compacted yet
+    two = shard_store(tmp_path, second)
+    failing = next(name for name in COMPANIES[10:] if second.owns(name))
+    two.record_failure(failing, 'no_jobs')
+    two.flush()
+
+    assert merge_shards(2, str(tmp_path)) == {1, 2}
+
+    processed = read(tmp_path / 'processed_companies.json')
+    failed = read(tmp_path / 'failed_companies.json')
+    assert set(processed) == {name for name in COMPANIES if first.owns(name)}
+    assert failed == {failing: {'count': 1, 'reason': 'no_jobs'}}
+
+
+def test_shard_without_output_keeps_its_merged_entries(tmp_path):
+    merged = StateStore(str(tmp_path / 'processed_companies.json'), str(tmp_path / 'failed_companies.json'),
+                        str(tmp_path / 'crawler_state.journal'))
+    merged.replace(COMPANIES, {})
+    merged.close()
+    shard_store(tmp_path, Shard(1, 2)).close()
+
+    assert merge_shards(2, str(tmp_path)) == {1}
+
+    processed = read(tmp_path / 'processed_companies.json')
+    assert set(processed) == {name for name in COMPANIES if shard_of(name, 2) == 2}
@@ -0,0 +1,39 @@
+import json
+
+from state_store import StateStore
+
+
+def open_store(tmp_path, **kwargs):
+    return StateStore(str(tmp_path / 'processed.json'), str(tmp_path / 'failed.json'),
+                      str(tmp_path / 'state.journal'), **kwargs)
+
+
+def test_journal_is_replayed_after_a_crash(tmp_path):
+    store = open_store(tmp_path)
+    store.mark_processed('Acme Ltd')
+    store.record_failure('Widgets PLC', 'no_website')
+    store.record_failure('Widgets PLC', 'no_website', error='timed out')
+    store.flush()
+    # Crash: the process dies without compacting, leaving a torn last line
+    with open(tmp_path / 'state.journal', 'a') as f:
+        f.write('{"op": "processed", "comp')
+
+    reopened = open_store(tmp_path)
+
+    assert list(reopened.processed) == ['Acme Ltd']
+    assert reopened.failed == {'Widgets PLC': {'count': 2, 'reason': 'no_website', 'last_error': 'timed out'}}
+
+
+def test_compaction_writes_snapshots_and_empties_the_journal(tmp_path):
+    store = open_store(tmp_path, compact_every=3)
+    store.mark_processed('Acme Ltd')
+    store.mark_processed('Beta Ltd')
+    store.record_failure('Widgets PLC', 'no_jobs')
+
+    assert json.loads((tmp_path / 'processed.json').read_text()) == ['Acme Ltd', 'Beta Ltd']
+    assert json.loads((tmp_path / 'failed.json').read_text()) == {'Widgets PLC': {'count': 1, 'reason': 'no_jobs'}}
+    assert (tmp_path / 'state.journal').read_text() == ''
+
+    store.mark_processed('Gamma Ltd')
+    store.close()
+    assert list(open_store(tmp_path).processed) == ['Acme Ltd', 'Beta Ltd', 'Gamma Ltd']
@@ -0,0 +1,472 @@
+import hashlib
+import logging
+import os
+import socket
+import ssl
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import DEFAULT_CA_BUNDLE_PATH, get_encoding_from_headers
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+from urllib3.poolmanager import SSL_KEYWORDS
+from urllib3.util.ssl_ import create_urllib3_context, resolve_cert_reqs
+
+logger = logging.getLogger(__name__)
+
+# Current desktop browsers; one is picked per host so each site sees a consistent client
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 Edg/124.0.0.0',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4.1 Safari/605.1.15',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14.4; rv:125.0) Gecko/20100101 Firefox/125.0',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0',
+]
+
+# Hop-by-hop headers; HTTP/2 forbids them
+HOP_BY_HOP_HEADERS = {'connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade'}
+
+
+def parse_address(value):
+    """'host:port' -> (host, port)"""
+    host, _, port = value.rpartition(':')
+    if not host or not port.isdigit():
+        raise ValueError(f"Expected host:port, got {value!r}")
+    return host, int(port)
+
+
+class UserAgents:
+    """Picks a User-Agent per host from a bundled list, reshuffled every run"""
+
+    def __init__(self, agents=USER_AGENTS, seed=None):
+        self.agents = list(agents)
+        self.seed = os.urandom(8) if seed is None else str(seed).encode('utf-8')
+
+    def for_host(self, host):
+        digest = hashlib.blake2b((host or '').lower().encode('utf-8'), digest_size=8, key=self.seed).digest()
+        return self.agents[int.from_bytes(digest, 'big') % len(self.agents)]
+
+
+class Resolver:
+    """Host name lookups for the crawler's connections and candidate-domain checks
+
+    Lookups are cached for `ttl` seconds (failures for `negative_ttl`), so a
+    domain found by the candidate-domain checks is not looked up again when
+    it is fetched.
+
+    `connect_to` ("host:port") sends every connection to one address while URLs
+    and Host headers keep the real names, like curl's --connect-to; it is meant
+    for a local plain-HTTP fake web, so https URLs are not wrapped in TLS there.
+    With `known_hosts`, only those names resolve and the rest fail like NXDOMAIN.
+    """
+
+    def __init__(self, connect_to=None, known_hosts=None, ttl=300, negative_ttl=60):
+        self.connect_to = parse_address(connect_to) if isinstance(connect_to, str) else connect_to
+        self.known_hosts = {host.lower() for host in known_hosts} if known_hosts is not None else None
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.stats = {'lookups': 0, 'cache_hits': 0}
+
+    @staticmethod
+    def _name(host):
+        return host.lower().rstrip('.')
+
+    def _known(self, host):
+        return self.known_hosts is None or self._name(host) in self.known_hosts
+
+    def lookup(self, host, port=443):
+        """IP addresses of a host (IPv4 first), or [] if it doesn't resolve"""
+        name = self._name(host)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(name)
+            if entry is not None and entry[1] > now:
+                self.stats['cache_hits'] += 1
+                return entry[0]
+            self.stats['lookups'] += 1
+
+        try:
+            infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            addresses = sorted(dict.fromkeys(info[4][0] for info in infos), key=lambda address: ':' in address)
+        except (OSError, UnicodeError):
+            addresses = []
+
+        with self._lock:
+            self._cache[name] = (addresses, now + (self.ttl if addresses else self.negative_ttl))
+        return addresses
+
+    def forget(self, host):
+        """Drop a cached lookup, e.g. after connecting to its address failed"""
+        with self._lock:
+            self._cache.pop(self._name(host), None)
+
+    def resolves(self, host):
+        """Whether a host name has an address"""
+        if not self._known(host):
+            return False
+        if self.connect_to is not None:
+            return True
+        return bool(self.lookup(host))
+
+    def addresses(self, host, port):
+        """(address, port) targets to try in turn for a URL's host and port"""
+        if not self._known(host):
+            raise socket.gaierror(socket.EAI_NONAME, f"Unknown host {host}")
+        if self.connect_to is not None:
+            return [self.connect_to]
+        addresses = self.lookup(host, port)
+        if not addresses:
+            raise socket.gaierror(socket.EAI_NONAME, f"Unknown host {host}")
+        return [(address, port) for address in addresses]
+
+
+class SessionReusingContext(ssl.SSLContext):
+    """SSLContext that resumes the previous TLS session to the same host
+
+    Resumption skips most of a full handshake when reconnecting to a host whose
+    pooled connection was closed. Sessions are kept for the `max_hosts` most
+    recently used hosts. Hostnames are matched by urllib3 itself
+    (check_hostname is off, as for any caller-supplied context).
+    """
+
+    max_hosts = 1024
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, host, ssl_sock):
+        """Keep a connection's session; call it once a response was read, when TLS 1.3 tickets have arrived"""
+        session = getattr(ssl_sock, 'session', None)
+        if not host or session is None:
+            return
+        with self._lock:
+            self._sessions[host] = session
+            self._sessions.move_to_end(host)
+            if len(self._sessions) > self.max_hosts:
+                self._sessions.popitem(last=False)
+
+    def wrap_socket(self, sock, server_side=False, do_handshake_on_connect=True, suppress_ragged_eofs=True,
+                    server_hostname=None, session=None):
+        if session is None and server_hostname:
+            with self._lock:
+                session = self._sessions.get(server_hostname)
+        try:
+            return super().wrap_socket(sock, server_side, do_handshake_on_connect, suppress_ragged_eofs,
+                                       server_hostname, session)
+        except ValueError:
+            # Session from a different server configuration; do a full handshake
+            return super().wrap_socket(sock, server_side, do_handshake_on_connect, suppress_ragged_eofs,
+                                       server_hostname)
+
+
+def session_reusing_context():
+    """SessionReusingContext with urllib3's defaults and the CA bundle requests would use"""
+    defaults = create_urllib3_context()
+    context = SessionReusingContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_REQUIRED
+    context.minimum_version = defaults.minimum_version
+    context.options |= defaults.options
+    # Same lookup as requests' merge_environment_settings
+    context.ca_bundle = os.environ.get('REQUESTS_CA_BUNDLE') or os.environ.get('CURL_CA_BUNDLE') or DEFAULT_CA_BUNDLE_PATH
+    context.load_verify_locations(context.ca_bundle)
+    return context
+
+
+class ResolvingConnectionMixin:
+    """Looks up the connection target through the transport's resolver and times connection setup"""
+
+    transport = None
+
+    def _new_conn(self):
+        host, port = self._dns_host, self.port
+        start = time.perf_counter()
+        try:
+            targets = self.transport.resolver.addresses(self.host, self.port)
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to resolve {self.host}: {e}") from e
+        resolved = time.perf_counter()
+        # Every address in turn, as urllib3 itself would, in case the first is unreachable
+        try:
+            for i, target in enumerate(targets):
+                # Only the socket goes to the target; Host header and TLS SNI keep the real name
+                self._dns_host, self.port = target
+                try:
+                    conn = super()._new_conn()
+                    break
+                except NewConnectionError:
+                    if i == len(targets) - 1:
+                        # The cached addresses may be stale
+                        self.transport.resolver.forget(host)
+                        raise
+        finally:
+            self._dns_host, self.port = host, port
+        self._setup_seconds = (resolved - start, time.perf_counter() - resolved)
+        return conn
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        dns_seconds, tcp_seconds = getattr(self, '_setup_seconds', (0.0, 0.0))
+        resumed = getattr(self.sock, 'session_reused', None)
+        tls_seconds = time.perf_counter() - start - dns_seconds - tcp_seconds if resumed is not None else None
+        self.transport.record_connection(dns_seconds, tcp_seconds, tls_seconds, resumed)
+
+
+class TlsSessionMixin:
+    """Uses the transport's session-resuming context for connections with default certificate checks
+
+    Connections with their own CA bundle, client certificate or verify=False
+    get a context of their own, so those settings never leak into the shared one.
+    """
+
+    transport = None
+
+    def connect(self):
+        if self.ssl_context is self.transport.ssl_context:
+            if self.ca_certs == self.ssl_context.ca_bundle:
+                # Already loaded into the shared context
+                self.ca_certs = None
+            if (self.ca_certs or self.ca_cert_dir or self.ca_cert_data or self.cert_file
+                    or resolve_cert_reqs(self.cert_reqs) != ssl.CERT_REQUIRED):
+                self.ssl_context = None
+        super().connect()
+
+    def getresponse(self, *args, **kwargs):
+        # Held on to because a "Connection: close" response detaches it from the connection
+        sock = self.sock
+        response = super().getresponse(*args, **kwargs)
+        if self.ssl_context is self.transport.ssl_context:
+            self.transport.ssl_context.remember(self.host, sock)
+        return response
+
+
+class PlainPoolMixin:
+    """Drops TLS options so an https URL can be served by a plain-HTTP connect_to target"""
+
+    def __init__(self, host, port=None, **kwargs):
+        for key in SSL_KEYWORDS:
+            kwargs.pop(key, None)
+        super().__init__(host, port, **kwargs)
+
+
+class HttpxRaw:
+    """Stands in for a urllib3 response as `Response.raw`, so a streamed httpx body reads like one"""
+
+    def __init__(self, reply, request, httpx):
+        self.reply = reply
+        self.request = request
+        self.httpx = httpx
+
+    def stream(self, chunk_size=None, decode_content=True):
+        try:
+            yield from self.reply.iter_bytes(chunk_size)
+        except self.httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e, request=self.request)
+        except self.httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(e, request=self.request)
+
+    def read(self, amt=None):
+        return b''.join(self.stream(amt))
+
+    def close(self):
+        self.reply.close()
+
+
+class Http2Adapter(BaseAdapter):
+    """Sends requests through an httpx client, multiplexed over HTTP/2 where the server offers it
+
+    Needs the optional `httpx[http2]` package. The client verifies against
+    `ca_bundle`; requests with another `verify` setting or a client `cert` go
+    to the `fallback` adapter instead, over HTTP/1.1.
+    """
+
+    def __init__(self, max_connections=10, fallback=None, ca_bundle=DEFAULT_CA_BUNDLE_PATH):
+        import httpx
+
+        super().__init__()
+        self.httpx = httpx
+        self.fallback = fallback
+        self.ca_bundle = ca_bundle
+        self.client = httpx.Client(
+            http2=True, follow_redirects=False, verify=ssl.create_default_context(cafile=ca_bundle),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+
+    def accepts(self, verify=True, cert=None):
+        """Whether the httpx client can send a request with these certificate settings"""
+        return cert is None and verify in (True, self.ca_bundle)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if not self.accepts(verify, cert):
+            if self.fallback is None:
+                raise requests.exceptions.InvalidURL(f"HTTP/2 client can't use verify={verify!r}, cert={cert!r}")
+            return self.fallback.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert,
+                                      proxies=proxies)
+
+        if isinstance(timeout, tuple):
+            timeout = self.httpx.Timeout(timeout[1], connect=timeout[0])
+        headers = [(name, value) for name, value in request.headers.items()
+                   if name.lower() not in HOP_BY_HOP_HEADERS]
+        try:
+            reply = self.client.send(
+                self.client.build_request(request.method, request.url, headers=headers, content=request.body,
+                                          timeout=timeout),
+                stream=stream
+            )
+            content = None if stream else reply.content
+        except self.httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e, request=request)
+        except self.httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+
+        response = requests.Response()
+        response.status_code = reply.status_code
+        response.reason = reply.reason_phrase
+        response.headers = CaseInsensitiveDict(reply.headers.items())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.http_version = reply.http_version
+        # Streamed bodies are read through `raw`, so byte caps and early stops apply; httpx decodes gzip/deflate
+        response.raw = HttpxRaw(reply, request, self.httpx)
+        if not stream:
+            response._content = content
+            response._content_consumed = True
+        return response
+
+    def close(self):
+        self.client.close()
+
+
+class Transport:
+    """Connection settings shared by the crawler's HTTP adapters
+
+    `pool_connections` hosts keep up to `pool_maxsize` idle keep-alive
+    connections each. New connections resolve through `resolver` (with its DNS
+    cache) and resume TLS sessions. Their setup cost goes to `metrics` as
+    crawler_connect_seconds{phase=dns|tcp|tls}. Hosts in `http2_hosts` are
+    sent through an Http2Adapter when httpx is installed.
+    """
+
+    def __init__(self, resolver=None, pool_connections=100, pool_maxsize=32, http2_hosts=(), metrics=None):
+        self.resolver = resolver or Resolver()
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.http2_hosts = [host.strip().lower() for host in http2_hosts if host.strip()]
+        self.metrics = metrics
+        self.ssl_context = session_reusing_context()
+        self.http2_adapter = None
+        self._sessions = []
+        self.stats = {'connections': 0, 'tls_handshakes': 0, 'tls_resumed': 0, 'setup_seconds': 0.0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, resolver=None, metrics=None):
+        """Transport configured from HTTP_POOL_HOSTS, HTTP_POOL_SIZE, DNS_CACHE_SECONDS and HTTP2_HOSTS"""
+        if resolver is None:
+            resolver = Resolver(os.getenv('CRAWLER_CONNECT_TO'), ttl=float(os.getenv('DNS_CACHE_SECONDS', '300')))
+        return cls(
+            resolver,
+            pool_connections=int(os.getenv('HTTP_POOL_HOSTS', '100')),
+            pool_maxsize=int(os.getenv('HTTP_POOL_SIZE', '32')),
+            http2_hosts=os.getenv('HTTP2_HOSTS', '').split(','),
+            metrics=metrics
+        )
+
+    def record_connection(self, dns_seconds, tcp_seconds, tls_seconds=None, resumed=None):
+        setup_seconds = dns_seconds + tcp_seconds + (tls_seconds or 0.0)
+        with self._lock:
+            self.stats['connections'] += 1
+            self.stats['setup_seconds'] += setup_seconds
+            if tls_seconds is not None:
+                self.stats['tls_handshakes'] += 1
+                self.stats['tls_resumed'] += bool(resumed)
+        if self.metrics is not None:
+            self.metrics.observe('crawler_connect_seconds', dns_seconds, phase='dns')
+            self.metrics.observe('crawler_connect_seconds', tcp_seconds, phase='tcp')
+            if tls_seconds is not None:
+                self.metrics.observe('crawler_connect_seconds', tls_seconds, phase='tls')
+                self.metrics.inc('crawler_tls_handshakes_total', resumed=str(bool(resumed)).lower())
+
+    def summary(self):
+        with self._lock:
+            stats = dict(self.stats, setup_seconds=round(self.stats['setup_seconds'], 3))
+        return dict(stats, dns_lookups=self.resolver.stats['lookups'], dns_cache_hits=self.resolver.stats['cache_hits'])
+
+    def configure(self, adapter):
+        """Size an HTTPAdapter's pools and route its new connections through this transport"""
+        adapter._pool_connections = self.pool_connections
+        adapter._pool_maxsize = self.pool_maxsize
+        adapter.init_poolmanager(self.pool_connections, self.pool_maxsize, ssl_context=self.ssl_context)
+
+        attributes = {'transport': self}
+        http_connection = type('ResolvingHTTPConnection', (ResolvingConnectionMixin, HTTPConnection), attributes)
+        http_pool = type('ResolvingHTTPConnectionPool', (HTTPConnectionPool,), {'ConnectionCls': http_connection})
+        if self.resolver.connect_to is not None:
+            https_pool = type('PlainHTTPSConnectionPool', (PlainPoolMixin, http_pool), {})
+        else:
+            https_connection = type('ResolvingHTTPSConnection',
+                                    (ResolvingConnectionMixin, TlsSessionMixin, HTTPSConnection), attributes)
+            https_pool = type('ResolvingHTTPSConnectionPool', (HTTPSConnectionPool,),
+                              {'ConnectionCls': https_connection})
+
+        adapter.poolmanager.pool_classes_by_scheme = {'http': http_pool, 'https': https_pool}
+        return adapter
+
+    def session(self):
+        """Plain requests.Session (no politeness scheduling or HTTP cache) over this transport's connections"""
+        session = requests.Session()
+        adapter = self.configure(HTTPAdapter())
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        self._sessions.append(session)
+        return session
+
+    def mount(self, session, adapter):
+        """Mount a configured adapter for every URL, and the HTTP/2 adapter for `http2_hosts`
+
+        An adapter with a `route` method (http_cache.CachingAdapter) keeps sending
+        `http2_hosts` requests itself, through the HTTP/2 adapter, so they are still
+        cached and revalidated.
+        """
+        self.configure(adapter)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        if not self.http2_hosts:
+            return session
+        if self.resolver.connect_to is not None:
+            logger.warning("HTTP2_HOSTS is ignored with CRAWLER_CONNECT_TO")
+            return session
+        try:
+            self.http2_adapter = Http2Adapter(self.pool_maxsize, fallback=adapter, ca_bundle=self.ssl_context.ca_bundle)
+        except ImportError:
+            logger.warning("HTTP2_HOSTS needs the httpx[http2] package; using HTTP/1.1 keep-alive")
+            return session
+        for host in self.http2_hosts:
+            if hasattr(adapter, 'route'):
+                adapter.route(f"https://{host}/", self.http2_adapter)
+            else:
+                session.mount(f"https://{host}/", self.http2_adapter)
+        return session
+
+    def close(self):
+        for session in self._sessions:
+            session.close()
+        if self.http2_adapter is not None:
+            self.http2_adapter.close()
@@ -0,0 +1,102 @@
+import logging
+import sqlite3
+import time
+
+from sqlite_store import SqliteStore
+
+logger = logging.getLogger(__name__)
+
+
+class SqliteCache(SqliteStore):
+    """One SQLite table of key -> values, with a TTL for hits and a shorter one for misses
+
+    Subclasses name the `table`, its text `key`, the value `columns` as
+    (name, SQL type) pairs and the `stamp` column holding when a row was stored,
+    and say in `is_miss` which values record a failed lookup.
+    """
+
+    table = None
+    key = None
+    columns = ()
+    stamp = None
+
+    def __init__(self, path, ttl_days, negative_ttl_days):
+        self.ttl = ttl_days * 86400
+        self.negative_ttl = negative_ttl_days * 86400
+        self._names = [name for name, _ in self.columns]
+        super().__init__(path)
+
+    @property
+    def schema(self):
+        columns = ''.join(f", {name} {sql_type}" for name, sql_type in self.columns)
+        return (f"CREATE TABLE IF NOT EXISTS {self.table} "
+                f"({self.key} TEXT PRIMARY KEY{columns}, {self.stamp} REAL NOT NULL)")
+
+    def is_miss(self, values):
+        return not values[0]
+
+    def get_values(self, key):
+        """(*values, stamp) stored for a key, or None on a miss or expired entry"""
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(self._names)}, {self.stamp} FROM {self.table} WHERE {self.key} = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        ttl = self.negative_ttl if self.is_miss(row[:-1]) else self.ttl
+        if time.time() - row[-1] > ttl:
+            return None
+        return row
+
+    def put_values(self, rows, description):
+        """Store (key, *values) rows in one transaction; `description` names them in errors"""
+        now = time.time()
+        placeholders = ', '.join('?' * (len(self._names) + 2))
+        try:
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} ({self.key}, {', '.join(self._names)}, {self.stamp}) "
+                    f"VALUES ({placeholders})",
+                    [(*row, now) for row in rows]
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Error caching {description}: {e}")
+
+    def delete(self, key, description):
+        try:
+            with self._lock, self.conn:
+                self.conn.execute(f"DELETE FROM {self.table} WHERE {self.key} = ?", (key,))
+        except sqlite3.Error as e:
+            logger.error(f"Error invalidating cached {description}: {e}")
+
+
+class WebsiteCache(SqliteCache):
+    """On-disk cache of company name -> resolved website, with TTLs and negative caching"""
+
+    table = 'websites'
+    key = 'company'
+    columns = (('url', 'TEXT'), ('strategy', 'TEXT NOT NULL'))
+    stamp = 'resolved_at'
+
+    def __init__(self, path='website_cache.sqlite', ttl_days=30, negative_ttl_days=7):
+        super().__init__(path, ttl_days, negative_ttl_days)
+
+    def get(self, company_name):
+        """Return the cached entry for a company, or None on a miss or expired entry
+
+        A cached entry with url=None means we recently failed to find a website.
+        """
+        row = self.get_values(company_name)
+        if row is None:
+            return None
+        url, strategy, resolved_at = row
+        return {'url': url, 'strategy': strategy, 'resolved_at': resolved_at}
+
+    def put(self, company_name, url, strategy):
+        """Record a resolution result; pass url=None with strategy 'no_website' for a miss"""
+        self.put_values([(company_name, url, strategy)], f"website for {company_name}")
+
+    def invalidate(self, company_name):
+        """Forget a company so the next run resolves it from scratch"""
+        self.delete(company_name, f"website for {company_name}")
@@ -0,0 +1,267 @@
+import json
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from website_cache import SqliteCache
+
+logger = logging.getLogger(__name__)
+
+WIKIPEDIA_API = 'https://en.wikipedia.org/w/api.php'
+WIKIDATA_API = 'https://www.wikidata.org/w/api.php'
+
+# The MediaWiki API takes up to 50 titles (or Wikidata ids) per query
+MAX_TITLES = 50
+MAX_LINKS = 5
+
+# Legal-form endings Wikipedia titles usually leave out ("Tesco PLC" -> "Tesco")
+LEGAL_SUFFIX_PATTERN = re.compile(r'(?:[\s,]+(?:ltd|limited|plc|llp|inc|corp|co)\.?)+$', re.IGNORECASE)
+SKIPPED_LINK_DOMAINS = ('facebook', 'twitter', 'linkedin', 'instagram', 'youtube', 'wikipedia', 'wikidata',
+                        'archive.org', 'companieshouse', 'companies.house')
+
+
+def title_variants(company_name):
+    """Page titles a company's article is likely to have, most specific first"""
+    variants = [company_name]
+    short = LEGAL_SUFFIX_PATTERN.sub('', company_name).strip()
+    if short:
+        variants.append(short)
+        if short.isupper():
+            # "ACME WIDGETS LIMITED" -> "Acme Widgets"
+            variants.append(short.title())
+    return list(dict.fromkeys(variants))
+
+
+def _link_url(link):
+    # formatversion=2 gives {'url': ...}, formatversion=1 {'*': ...}
+    return link if isinstance(link, str) else link.get('url') or link.get('*')
+
+
+def _chunks(items, size=MAX_TITLES):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class WikipediaCache(SqliteCache):
+    """On-disk cache of company name -> website candidates found through Wikipedia/Wikidata"""
+
+    table = 'websites'
+    key = 'company'
+    columns = (('urls', 'TEXT NOT NULL'),)
+    stamp = 'fetched_at'
+
+    def __init__(self, path='wikipedia_cache.sqlite', ttl_days=30, negative_ttl_days=7):
+        super().__init__(path, ttl_days, negative_ttl_days)
+
+    def is_miss(self, values):
+        return not json.loads(values[0])
+
+    def get(self, company_name):
+        """Cached candidate URLs for a company ([] for a recent miss), or None"""
+        row = self.get_values(company_name)
+        return json.loads(row[0]) if row is not None else None
+
+    def put_many(self, results):
+        """Store {company name: candidate URLs} in one transaction"""
+        self.put_values([(name, json.dumps(urls)) for name, urls in results.items()], "Wikipedia results")
+
+
+class WikipediaResolver:
+    """Finds official-website candidates for many companies with batched MediaWiki queries
+
+    `prefetch` looks up the whole run's companies before crawling starts:
+
+    1. exact article titles (with redirects) for every company, 50 per query
+    2. the Wikidata official website (P856) for every article, 50 per query
+    3. external links of articles without P856, 50 per query
+
+    Companies without an exact title are only searched for (search can't be
+    batched) if the crawl actually reaches them in `official_websites`.
+    Results, including misses, go into `cache`.
+    """
+
+    def __init__(self, session, cache, timeout=10, search_workers=8, api=WIKIPEDIA_API, wikidata_api=WIKIDATA_API):
+        self.session = session
+        self.cache = cache
+        self.timeout = timeout
+        self.api = api
+        self.wikidata_api = wikidata_api
+        self.executor = ThreadPoolExecutor(max_workers=search_workers, thread_name_prefix='wikipedia')
+        # Prefetched companies known to have no article under their own name
+        self._untitled = set()
+        self._lock = threading.Lock()
+        self.stats = {'prefetched': 0, 'cached': 0, 'resolved': 0, 'requests': 0}
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self.stats[key] += value
+
+    def prefetch(self, company_names):
+        """Resolve every company not already cached by exact title, in a few bulk queries"""
+        names = [name for name in dict.fromkeys(company_names) if self.cache.get(name) is None]
+        if not names:
+            return
+        self._count('prefetched', len(names))
+        articles = self.find_articles(names)
+        results = self.websites(articles, names)
+        # Only hits are stored: the rest may still turn up through search
+        self.cache.put_many({name: results[name] for name in articles})
+        with self._lock:
+            self._untitled.update(name for name in names if name not in articles)
+        logger.info(f"Wikipedia prefetch: {len(articles)}/{len(names)} companies have an article")
+
+    def official_websites(self, company_name):
+        """Candidate website URLs for a company, best first ([] if none were found)"""
+        cached = self.cache.get(company_name)
+        if cached is not None:
+            self._count('cached')
+            return cached
+
+        try:
+            with self._lock:
+                untitled = company_name in self._untitled
+            results = self.resolve_batch([company_name], untitled=[company_name] if untitled else ())
+        except Exception as e:
+            logger.error(f"Wikipedia lookup failed for {company_name}: {e}")
+            return []
+        self.cache.put_many(results)
+        return results[company_name]
+
+    def _get(self, url, params):
+        self._count('requests')
+        response = self.session.get(url, params=dict(params, format='json', formatversion=2), timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def resolve_batch(self, company_names, untitled=()):
+        """{company name: candidate URLs}; `untitled` companies are known to need a search"""
+        self._count('resolved', len(company_names))
+        articles = self.find_articles([name for name in company_names if name not in untitled])
+        # Search for the rest in parallel, then look their results up together
+        missing = [name for name in company_names if name not in articles]
+        if missing:
+            searched = dict(zip(missing, self.executor.map(self.search, missing)))
+            pages = self.find_pages(title for titles in searched.values() for title in titles)
+            for name, titles in searched.items():
+                articles[name] = [pages[title] for title in titles if title in pages]
+        return self.websites(articles, company_names)
+
+    def find_articles(self, company_names):
+        """{company name: [article]} for companies with an article under one of their title variants"""
+        # e.g. "Tesco PLC" or "Tesco"
+        variants = {name: title_variants(name) for name in company_names}
+        pages = self.find_pages(title for titles in variants.values() for title in titles)
+        articles = {}
+        for name, titles in variants.items():
+            found = [pages[title] for title in titles if title in pages]
+            if found:
+                articles[name] = found[:1]
+        return articles
+
+    def websites(self, articles, company_names):
+        """{company name: candidate URLs} from the Wikidata website, else the external links, of each article"""
+        items = {page['wikibase_item'] for found in articles.values() for page in found if page['wikibase_item']}
+        websites = self.official_website_claims(items)
+
+        # External links only where Wikidata has no website
+        without = {page['title'] for found in articles.values() for page in found
+                   if not websites.get(page['wikibase_item'])}
+        links = self.external_links(without)
+
+        results = {}
+        for name in company_names:
+            urls = []
+            for page in articles.get(name, []):
+                urls.extend(websites.get(page['wikibase_item'], []))
+                urls.extend(self.rank_links(links.get(page['title'], []), name))
+            results[name] = list(dict.fromkeys(urls))[:MAX_LINKS]
+        return results
+
+    def find_pages(self, titles):
+        """{requested title: {'title', 'wikibase_item'}} for titles that are articles (redirects followed)"""
+        found = {}
+        for chunk in _chunks(dict.fromkeys(titles)):
+            data = self._get(self.api, {
+                'action': 'query',
+                'titles': '|'.join(chunk),
+                'redirects': 1,
+                'prop': 'pageprops',
+                'ppprop': 'wikibase_item|disambiguation',
+            })
+            query = data.get('query', {})
+            normalized = {entry['from']: entry['to'] for entry in query.get('normalized', [])}
+            redirects = {entry['from']: entry['to'] for entry in query.get('redirects', [])}
+            by_title = {}
+            for page in query.get('pages', []):
+                props = page.get('pageprops', {})
+                if page.get('missing') or page.get('invalid') or 'disambiguation' in props:
+                    continue
+                by_title[page['title']] = {'title': page['title'], 'wikibase_item': props.get('wikibase_item')}
+
+            for title in chunk:
+                target = normalized.get(title, title)
+                target = redirects.get(target, target)
+                if target in by_title:
+                    found[title] = by_title[target]
+        return found
+
+    def search(self, company_name):
+        """Titles of the top full-text search results for a company"""
+        data = self._get(self.api, {
+            'action': 'query',
+            'list': 'search',
+            'srsearch': f"{company_name} company UK",
+            'srlimit': 3,
+            'srprop': '',
+        })
+        return [result['title'] for result in data.get('query', {}).get('search', [])]
+
+    def official_website_claims(self, items):
+        """{Wikidata id: official website URLs (P856)}, preferred-rank claims first"""
+        websites = {}
+        for chunk in _chunks(sorted(items)):
+            data = self._get(self.wikidata_api, {'action': 'wbgetentities', 'ids': '|'.join(chunk), 'props': 'claims'})
+            for item, entity in data.get('entities', {}).items():
+                claims = entity.get('claims', {}).get('P856', [])
+                claims = sorted(claims, key=lambda claim: claim.get('rank') != 'preferred')
+                urls = [claim['mainsnak'].get('datavalue', {}).get('value') for claim in claims
+                        if claim.get('rank') != 'deprecated']
+                websites[item] = [url for url in urls if isinstance(url, str)]
+        return websites
+
+    def external_links(self, titles, max_continues=5):
+        """{page title: external link URLs}"""
+        links = {}
+        for chunk in _chunks(sorted(titles)):
+            params = {'action': 'query', 'titles': '|'.join(chunk), 'prop': 'externallinks', 'ellimit': 'max'}
+            for _ in range(max_continues):
+                data = self._get(self.api, params)
+                for page in data.get('query', {}).get('pages', []):
+                    links.setdefault(page['title'], []).extend(
+                        url for url in map(_link_url, page.get('externallinks', [])) if url
+                    )
+                if 'continue' not in data:
+                    break
+                params = dict(params, **data['continue'])
+        return links
+
+    @staticmethod
+    def rank_links(links, company_name):
+        """Plausible homepage links, those whose domain contains a word of the name first"""
+        words = [word for word in re.findall(r'[a-z0-9]+', company_name.lower()) if len(word) > 2]
+        candidates = []
+        for link in links:
+            if link.startswith('//'):
+                link = f"https:{link}"
+            host = (urlparse(link).hostname or '').lower()
+            if not host.endswith(('.com', '.co.uk', '.uk')) or any(skip in host for skip in SKIPPED_LINK_DOMAINS):
+                continue
+            candidates.append(link.split('?')[0])
+        return sorted(dict.fromkeys(candidates), key=lambda link: not any(
+            word in (urlparse(link).hostname or '') for word in words))
+
+    def close(self):
+        self.executor.shutdown()